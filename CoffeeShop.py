@@ -1,80 +1,52 @@
 import streamlit as st
 import pandas as pd
-import random
 import io
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 import sqlite3
 import hashlib
-
-# Fixed branches for the business
-FIXED_BRANCHES = ["KLCC", "TRX", "Seri Iskandar"]
-
-# Coffee Menu Prices
-coffee_menu = {
-    'Americano': {'small': 3.75, 'medium': 5.00, 'large': 7.50},
-    'Cappuccino': {'small': 5.00, 'medium': 6.50, 'large': 8.00},
-    'Latte': {'small': 5.25, 'medium': 6.75, 'large': 8.25},
-    'Caramel Macchiato': {'small': 4.50, 'medium': 7.00, 'large': 9.50}
-}
-
-# Prices for add-ons
-add_on_prices = {
-    'Extra sugar': 0.70,  # Extra 5g of sugar
-    'Extra milk': 0.90,   # Extra 30ml of milk
-}
-
-# Ingredient usage per coffee type and size
-ingredient_usage = {
-    'Americano': {
-        'small': {'coffee_beans': 9, 'milk': 10, 'sugar': 5},
-        'medium': {'coffee_beans': 12, 'milk': 10, 'sugar': 5},
-        'large': {'coffee_beans': 15, 'milk': 10, 'sugar': 5}
-    },
-    'Cappuccino': {
-        'small': {'coffee_beans': 9, 'milk': 60, 'sugar': 5},
-        'medium': {'coffee_beans': 12, 'milk': 80, 'sugar': 5},
-        'large': {'coffee_beans': 15, 'milk': 100, 'sugar': 5}
-    },
-    'Latte': {
-        'small': {'coffee_beans': 9, 'milk': 100, 'sugar': 5},
-        'medium': {'coffee_beans': 12, 'milk': 150, 'sugar': 5},
-        'large': {'coffee_beans': 15, 'milk': 200, 'sugar': 5}
-    },
-    'Caramel Macchiato': {
-        'small': {'coffee_beans': 9, 'milk': 90, 'sugar': 5},
-        'medium': {'coffee_beans': 12, 'milk': 130, 'sugar': 5},
-        'large': {'coffee_beans': 15, 'milk': 180, 'sugar': 5}
-    }
-}
-
-# Extra usage for additional sugar and milk
-extra_usage = {
-    'milk': 30,   # Extra 30ml of milk for "Extra milk"
-    'sugar': 5    # Extra 5g of sugar for "Extra sugar"
-}
-
-if 'loyalty_points' not in st.session_state:
-    st.session_state['loyalty_points'] = 0  # Track customer loyalty points
-
-
-
-# Database connection and setup
-conn = sqlite3.connect('coffee_shop.db')
-c = conn.cursor()
-
-# Create tables for customers and admins if they don't exist
-c.execute('''CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY,
-                username TEXT UNIQUE,
-                password TEXT,
-                favorite_order TEXT
-            )''')
-c.execute('''CREATE TABLE IF NOT EXISTS admins (
-                id INTEGER PRIMARY KEY,
-                username TEXT UNIQUE,
-                password TEXT
-            )''')
-conn.commit()
+from muglife.charts import ChartCache, render_financial_bars, render_sales_pie
+from muglife.coupons import CouponUnavailable, add_coupon, load_coupon_usage, load_coupons, prune_expired_coupons
+from muglife.feedback import (add_feedback, count_feedback_matches, feedback_stats, feedback_totals,
+                              load_feedback_page, search_feedback)
+from muglife.kitchen import PROCESSING, READY, prep_time
+from muglife.ledger import count_orders, first_order_time, load_orders
+from muglife.loyalty import (EARNED, POINT_VALUE, REDEEMED, InsufficientPoints, count_loyalty_history,
+                             load_loyalty_history, loyalty_balance, points_earned)
+from muglife.menu import FIXED_BRANCHES, add_on_prices, coffee_menu, pricing_engine, restock_prices, usage_table
+from muglife.metrics import export_textfile_in_thread
+from muglife.order_numbers import pickup_code
+from muglife.perf import PAGE, profile_call, timings
+from muglife.rollups import load_rollups, rollup_totals
+from muglife.server import serve_in_thread
+from muglife.service import CoffeeShopService
+from muglife.templates import ADD_ON_ITEM, FEEDBACK_CARD, MENU_ITEM, ORDER_CARD, STYLESHEET, order_card_fields, render_table
+from muglife.usage import restock_cost
+
+
+
+
+# The shop's service core (database, order ledger, kitchen queues, stock and
+# order numbers), created once per process and shared by every session.
+# The UI only renders what the service returns and forwards button presses.
+# With MUGLIFE_API_PORT set, the HTTP/JSON endpoint for POS terminals and
+# kiosks is started on the same service, so both see the same queues and stock;
+# it also serves the Prometheus metrics at /metrics. With MUGLIFE_METRICS_FILE
+# set, the metrics are also written to that file for a textfile collector.
+@st.cache_resource
+def get_service():
+    service = CoffeeShopService('coffee_shop.db')
+    if os.environ.get('MUGLIFE_API_PORT'):
+        serve_in_thread(service, os.environ.get('MUGLIFE_API_HOST', '127.0.0.1'), int(os.environ['MUGLIFE_API_PORT']))
+    if os.environ.get('MUGLIFE_METRICS_FILE'):
+        export_textfile_in_thread(service.metrics, os.environ['MUGLIFE_METRICS_FILE'])
+    return service
+
+service = get_service()
+
+# Database connection pool shared by every session and script thread;
+# borrow a connection with `with db_pool.connection() as conn:`.
+db_pool = service.pool
 
 # Function to hash passwords for security
 def hash_password(password):
@@ -85,8 +57,8 @@ def signup(username, password, is_admin=False):
     password_hashed = hash_password(password)
     table = 'admins' if is_admin else 'customers'
     try:
-        c.execute(f"INSERT INTO {table} (username, password) VALUES (?, ?)", (username, password_hashed))
-        conn.commit()
+        with db_pool.connection() as conn, conn:
+            conn.execute(f"INSERT INTO {table} (username, password) VALUES (?, ?)", (username, password_hashed))
         st.success(f"Account created successfully for {'admin' if is_admin else 'customer'}!")
     except sqlite3.IntegrityError:
         st.error("Username already exists.")
@@ -95,8 +67,8 @@ def signup(username, password, is_admin=False):
 def login(username, password, is_admin=False):
     password_hashed = hash_password(password)
     table = 'admins' if is_admin else 'customers'
-    c.execute(f"SELECT * FROM {table} WHERE username=? AND password=?", (username, password_hashed))
-    user = c.fetchone()
+    with db_pool.connection() as conn:
+        user = conn.execute(f"SELECT * FROM {table} WHERE username=? AND password=?", (username, password_hashed)).fetchone()
     return user
 
 # Session management (added logout functionality)
@@ -105,6 +77,7 @@ def logout():
     if 'user' in st.session_state:
         del st.session_state['user']
         del st.session_state['is_admin']
+        st.session_state.pop('customer_id', None)
         st.success("You have been logged out.")
         st.rerun()  # Refresh to go back to the login page
 
@@ -156,7 +129,7 @@ def authenticate_user():
                     if st.button("Confirm Branch"):
                         st.session_state['admin_branch'] = selected_branch
                         st.success(f"Branch selected: {selected_branch}")
-                        st.experimental_rerun()  # Reload to apply changes
+                        st.rerun()  # Reload to apply changes
 
             # Logout option
             if st.button('Logout'):
@@ -178,6 +151,8 @@ def authenticate_user():
                     if user:
                         st.session_state['user'] = username
                         st.session_state['is_admin'] = is_admin
+                        if not is_admin:
+                            st.session_state['customer_id'] = user[0]
                         st.success(f"Welcome {'Admin' if is_admin else 'Customer'} {username}!")
                         if is_admin:
                             st.rerun()  # Refresh to unlock admin features
@@ -187,94 +162,77 @@ def authenticate_user():
 
 
 # Initialize Streamlit Session State to retain data across app interactions
-if 'branch_inventory' not in st.session_state:
-    st.session_state.branch_inventory = {branch: {
-        "coffee_beans": 1000,
-        "milk": 1000,
-        "sugar": 1000,
-        "cups": 500
-    } for branch in FIXED_BRANCHES}
 
 
 
-if 'sales_data' not in st.session_state:
-    st.session_state.sales_data = pd.DataFrame(columns=[
-        'Order Number', 'Customer Name', 'Coffee Type', 'Quantity',
-        'Size', 'Add-ons', 'Price', 'Time', 'Status', 'Branch'
-    ])
-    
 if 'order_history' not in st.session_state:
     st.session_state.order_history = {}
 
-# Initialize order_numbers set in session state
-if 'order_numbers' not in st.session_state:
-    st.session_state.order_numbers = set()
-
 # Initialize restock_history in session state
 if 'restock_history' not in st.session_state:
     st.session_state.restock_history = []
 
-# Initialize session state for coupons if not already initialized
-if 'coupons' not in st.session_state:
-    st.session_state.coupons = []
-
-if 'feedback' not in st.session_state:
-    st.session_state.feedback = []
-
-# Function to generate unique 4-digit order number
-def generate_unique_order_number():
-    existing_numbers = st.session_state.get('order_numbers', set())  # Get existing order numbers from session state
 
-    # Generate a unique order number
-    while True:
-        new_number = random.randint(1000, 9999)
-        if new_number not in existing_numbers:
-            st.session_state.order_numbers.add(new_number)
-            return new_number
 
 # JavaScript function to refresh the page
 def js_refresh():
     st.markdown("""<script>window.location.reload()</script>""", unsafe_allow_html=True)
 
 # Kitchen Orders Interface with box-styled layout
+# Orders shown per page on the kitchen and pickup screens (a 3 x 3 grid)
+ORDER_PAGE_SIZE = 9
+
+
+def step_page(page_key, step, pages):
+    st.session_state[page_key] = min(max(st.session_state.get(page_key, 0) + step, 0), pages - 1)
+
+
+# Previous/next controls for a long list; returns the offset of the page to
+# show. With shortcuts on, the Left and Right keys page through the list.
+def page_controls(key, total, page_size, shortcuts=False):
+    pages = -(-total // page_size)
+    page_key = f"{key}_page"
+    # The list may have shrunk since the last rerun (e.g. orders marked ready or picked up)
+    page = min(st.session_state.get(page_key, 0), pages - 1)
+    st.session_state[page_key] = page
+
+    if pages > 1:
+        previous, position, following = st.columns([1, 2, 1])
+        previous.button("◀ Previous", key=f"{key}_previous", on_click=step_page, args=(page_key, -1, pages),
+                        disabled=page == 0, shortcut="Left" if shortcuts else None)
+        position.caption(f"Page {page + 1} of {pages} · {total} total")
+        following.button("Next ▶", key=f"{key}_next", on_click=step_page, args=(page_key, 1, pages),
+                         disabled=page == pages - 1, shortcut="Right" if shortcuts else None)
+    return page * page_size
+
+
 def display_kitchen_orders():
     st.markdown("<h3>👨‍🍳 Kitchen Orders</h3>", unsafe_allow_html=True)
 
     if 'admin_branch' in st.session_state and st.session_state['admin_branch']:
         branch = st.session_state['admin_branch']
 
-        # Validate if the Branch column exists in sales data
-        if 'Branch' not in st.session_state.sales_data.columns:
-            st.error("Branch column is missing in sales data.")
-            return
+        # Only the visible page of the branch's kitchen queue is rendered
+        total = service.queue_count(PROCESSING, branch)
 
-        # Filter orders for the selected branch
-        branch_orders = st.session_state.sales_data[
-            st.session_state.sales_data['Branch'] == branch
-        ]
-        kitchen_orders = branch_orders[branch_orders['Status'] == 'Being Processed']
-
-        if not kitchen_orders.empty:
+        if total:
             st.markdown(f"### Orders in Progress for {branch} Branch")
-
-            for idx, order in kitchen_orders.iterrows():
-                st.markdown(
-                    f"""
-                    <div style='border: 1px solid #d9d9d9; border-radius: 10px; padding: 15px; margin-bottom: 10px; background-color: #f9f9f9;'>
-                        <strong>Order #{order['Order Number']}</strong><br>
-                        <strong>Customer:</strong> {order['Customer Name']}<br>
-                        <strong>Coffee:</strong> {order['Coffee Type']} ({order['Size']})<br>
-                        <strong>Add-ons:</strong> {order['Add-ons']}<br>
-                        <strong>Order Time:</strong> {order['Time']}<br>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-
-                # Button to mark the order as ready
-                if st.button(f"Mark Order #{order['Order Number']} as Ready", key=f"ready_{order['Order Number']}"):
-                    st.session_state.sales_data.at[idx, 'Status'] = 'Ready'
-                    st.success(f"Order #{order['Order Number']} marked as ready.")
+            offset = page_controls(f"kitchen_{branch}", total, ORDER_PAGE_SIZE, shortcuts=True)
+            kitchen_orders = service.queue_page(PROCESSING, offset, ORDER_PAGE_SIZE, branch)
+
+            # Every ticket goes out as one element, with the buttons in a grid below
+            st.markdown(ORDER_CARD.render_all(order_card_fields(order) for order in kitchen_orders), unsafe_allow_html=True)
+
+            columns = st.columns(3)
+            for i, order in enumerate(kitchen_orders):
+                # Button to mark the order as ready; keys follow the order, not its
+                # position, and keys 1-9 press the buttons in grid order
+                if columns[i % 3].button(f"Mark Order #{order['Pickup Code']} as Ready", key=f"ready_{order['Order Number']}",
+                                         shortcut=str(i + 1)):
+                    if service.mark_ready(branch, order['Order Number']):
+                        st.success(f"Order #{order['Pickup Code']} marked as ready.")
+                    else:
+                        st.warning(f"Order #{order['Pickup Code']} is no longer being processed.")
         else:
             st.info(f"No active orders for the branch: {branch}.")
     else:
@@ -282,25 +240,10 @@ def display_kitchen_orders():
 
 
 # Front Page Coffee Menu Display with clean, professional, and bright formatting
-from datetime import datetime
-import streamlit as st
 
-# Define daily special offers
+# Today's special offer, compiled once per day by the pricing engine
 def get_daily_special():
-    # Define daily special offers
-    daily_offers = {
-        "Monday": {"offer": "20% off on all Americano!", "coffee": "Americano", "discount": 0.20},
-        "Tuesday": {"offer": "30% off on all Cappuccino!", "coffee": "Cappuccino", "discount": 0.30},
-        "Wednesday": {"offer": "40% off on all Latte!", "coffee": "Latte", "discount": 0.40},
-        "Thursday": {"offer": "50% off on all Caramel Macchiato!", "coffee": "Caramel Macchiato", "discount": 0.50},
-        "Friday": {"offer": "15% off on all coffees!", "coffee": None, "discount": 0.15},
-        "Saturday": {"offer": "15% off on all coffees!", "coffee": None, "discount": 0.15},
-        "Sunday": {"offer": "15% off on all coffees!", "coffee": None, "discount": 0.15},
-    }
-
-    # Get today's special based on the current day
-    today = datetime.now().strftime("%A")
-    return daily_offers.get(today, {})
+    return service.daily_offer()
 
 
 # Coffee menu display with the daily special offer
@@ -311,95 +254,16 @@ def display_menu():
     st.markdown(f"<h3 style='color: #3D3D3D;'>🎉 Today's Special Offer: {offer_text}</h3>", unsafe_allow_html=True)
     
 
-    st.markdown("""
-        <style>
-            .menu-container {
-                background-color: #ffffff;
-                padding: 20px;
-                border-radius: 15px;
-                box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);
-                margin-bottom: 40px;
-            }
-            .menu-title {
-                color: #2C3E50;
-                font-size: 28px;
-                font-weight: bold;
-                margin-bottom: 25px;
-                text-align: center;
-            }
-            .menu-item-box {
-                background-color: #f9f9f9;
-                padding: 20px;
-                border-radius: 10px;
-                box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.05);
-                margin-bottom: 20px;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-            }
-            .item-title {
-                font-size: 22px;
-                font-weight: bold;
-                color: #34495E;
-            }
-            .item-prices {
-                font-size: 18px;
-                color: #3498DB;
-                text-align: right;
-            }
-            .addon-section {
-                margin-top: 30px;
-                background-color: #f9f9f9;
-                padding: 15px;
-                border-radius: 10px;
-                box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.05);
-            }
-            .addon-title {
-                font-size: 20px;
-                font-weight: bold;
-                color: #27AE60;
-                margin-bottom: 10px;
-            }
-            .addon-item {
-                font-size: 16px;
-                color: #2C3E50;
-                margin-top: 5px;
-            }
-        </style>
-    """, unsafe_allow_html=True)
-
-    st.markdown("<div class='menu-title'>📋 Our Coffee Menu</div>", unsafe_allow_html=True)
-
-    # Main menu container
-    st.markdown("<div class='menu-container'>", unsafe_allow_html=True)
-
-    # Styling each coffee item with box-style layout
-    for coffee, sizes in coffee_menu.items():
-        st.markdown(
-            f"""
-            <div class="menu-item-box">
-                <div class="item-title">{coffee}</div>
-                <div class="item-prices">
-                    Small: RM{sizes['small']:.2f} <br>
-                    Medium: RM{sizes['medium']:.2f} <br>
-                    Large: RM{sizes['large']:.2f}
-                </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-    st.markdown("</div>", unsafe_allow_html=True)
-
-    # Clean Add-ons section in a box
+    # Menu and add-ons rendered from the precompiled templates as a single element
+    menu_items = [{'coffee': coffee, **sizes} for coffee, sizes in coffee_menu.items()]
+    add_on_items = [{'add_on': add_on, 'price': price} for add_on, price in add_on_prices.items()]
     st.markdown(
-        f"""
-        <div class="addon-section">
-            <div class="addon-title">Add-ons</div>
-            <div class="addon-item">Extra sugar: RM{add_on_prices['Extra sugar']:.2f}</div>
-            <div class="addon-item">Extra milk: RM{add_on_prices['Extra milk']:.2f}</div>
-        </div>
-        """, unsafe_allow_html=True
+        "<div class='menu-title'>📋 Our Coffee Menu</div>"
+        + MENU_ITEM.render_all(menu_items, 'menu-container')
+        + "<div class='addon-section'><div class='addon-title'>Add-ons</div>"
+        + ''.join(ADD_ON_ITEM.render(item) for item in add_on_items)
+        + "</div>",
+        unsafe_allow_html=True
     )
 
     # Divider line to keep the layout neat and clean
@@ -407,149 +271,28 @@ def display_menu():
 
 
 
-
-# Prices for restock items
-restock_prices = {
-    'coffee_beans': 1.20,  # RM per 100g
-    'milk': 0.70,          # RM per 100ml
-    'sugar': 0.20,         # RM per 100g
-    'cups': 0.02           # RM per cup
-}
-
-
-
 def display_inventory():
     st.markdown("<h3 style='color: #3D3D3D;'>📦 Inventory Management</h3>", unsafe_allow_html=True)
     st.write("Here's a summary of the current inventory levels for essential items:")
 
     # Display current inventory in a clean, modern, and professional table
     st.markdown("### Current Stock Levels:")
-    st.markdown(
-        f"""
-        <style>
-            .inventory-table {{
-                width: 100%;
-                border-collapse: collapse;
-                margin: 20px 0;
-                font-size: 18px;
-                text-align: left;
-            }}
-            .inventory-table th, .inventory-table td {{
-                padding: 12px 15px;
-                border: 1px solid #ddd;
-            }}
-            .inventory-table th {{
-                background-color: #f4f4f4;
-                font-weight: bold;
-                color: #333;
-            }}
-            .inventory-table td {{
-                background-color: #ffffff;
-                color: #555;
-            }}
-            .inventory-table tbody tr:nth-child(even) td {{
-                background-color: #f9f9f9;
-            }}
-        </style>
-
-        <table class="inventory-table">
-            <thead>
-                <tr>
-                    <th>Item</th>
-                    <th>Current Quantity</th>
-                    <th>Unit</th>
-                </tr>
-            </thead>
-            <tbody>
-                <tr>
-                    <td>Coffee Beans</td>
-                    <td>{st.session_state.inventory['coffee_beans']}</td>
-                    <td>grams</td>
-                </tr>
-                <tr>
-                    <td>Milk</td>
-                    <td>{st.session_state.inventory['milk']}</td>
-                    <td>milliliters</td>
-                </tr>
-                <tr>
-                    <td>Sugar</td>
-                    <td>{st.session_state.inventory['sugar']}</td>
-                    <td>grams</td>
-                </tr>
-                <tr>
-                    <td>Cups</td>
-                    <td>{st.session_state.inventory['cups']}</td>
-                    <td>units</td>
-                </tr>
-            </tbody>
-        </table>
-        """,
-        unsafe_allow_html=True
-    )
-
+    inventory = st.session_state.inventory
+    st.markdown(render_table('inventory-table', 'Current Quantity', [
+        ('Coffee Beans', inventory['coffee_beans'], 'grams'),
+        ('Milk', inventory['milk'], 'milliliters'),
+        ('Sugar', inventory['sugar'], 'grams'),
+        ('Cups', inventory['cups'], 'units'),
+    ]), unsafe_allow_html=True)
 
     # Display restock prices under current stock levels in a modern and clean style
     st.markdown("### 🛒 Restock Price Menu:")
-    st.markdown(
-        f"""
-        <style>
-            .restock-table {{
-                width: 100%;
-                border-collapse: collapse;
-                margin: 20px 0;
-                font-size: 18px;
-                text-align: left;
-            }}
-            .restock-table th, .restock-table td {{
-                padding: 12px 15px;
-                border: 1px solid #ddd;
-            }}
-            .restock-table th {{
-                background-color: #f4f4f4;
-                font-weight: bold;
-            }}
-            .restock-table td {{
-                background-color: #ffffff;
-            }}
-            .restock-table tbody tr:nth-child(even) td {{
-                background-color: #f9f9f9;
-            }}
-        </style>
-
-        <table class="restock-table">
-            <thead>
-                <tr>
-                    <th>Item</th>
-                    <th>Price</th>
-                    <th>Unit</th>
-                </tr>
-            </thead>
-            <tbody>
-                <tr>
-                    <td>Coffee Beans</td>
-                    <td>RM{restock_prices['coffee_beans']:.2f}</td>
-                    <td>per 100g</td>
-                </tr>
-                <tr>
-                    <td>Milk</td>
-                    <td>RM{restock_prices['milk']:.2f}</td>
-                    <td>per 100ml</td>
-                </tr>
-                <tr>
-                    <td>Sugar</td>
-                    <td>RM{restock_prices['sugar']:.2f}</td>
-                    <td>per 100g</td>
-                </tr>
-                <tr>
-                    <td>Cups</td>
-                    <td>RM{restock_prices['cups']:.2f}</td>
-                    <td>per cup</td>
-                </tr>
-            </tbody>
-        </table>
-        """, 
-        unsafe_allow_html=True
-    )
+    st.markdown(render_table('restock-table', 'Price', [
+        ('Coffee Beans', f"RM{restock_prices['coffee_beans']:.2f}", 'per 100g'),
+        ('Milk', f"RM{restock_prices['milk']:.2f}", 'per 100ml'),
+        ('Sugar', f"RM{restock_prices['sugar']:.2f}", 'per 100g'),
+        ('Cups', f"RM{restock_prices['cups']:.2f}", 'per cup'),
+    ]), unsafe_allow_html=True)
 
     # Manual Restock Section
     st.markdown("### 🔄 Manual Restock:")
@@ -660,13 +403,15 @@ def generate_invoice():
     else:
         st.write("No restock history available to generate an invoice.")
 
-import matplotlib.pyplot as plt
+# Rendered sales charts shared by every session; matplotlib itself is only
+# imported the first time a chart actually has to be drawn
+@st.cache_resource
+def get_chart_cache():
+    return ChartCache()
 
-# Update the sales report to include the actual final price after discount (which is the price customer pays)
-import matplotlib.pyplot as plt
-import pandas as pd
-from datetime import datetime
+chart_cache = get_chart_cache()
 
+# Update the sales report to include the actual final price after discount (which is the price customer pays)
 
 def sales_report():
     st.markdown("<h3 style='color: #3D3D3D; text-align: center;'>📊 Sales Report</h3>", unsafe_allow_html=True)
@@ -676,25 +421,35 @@ def sales_report():
         return
 
     branch = st.session_state['admin_branch']
-    branch_sales_data = st.session_state.sales_data[st.session_state.sales_data['Branch'] == branch]
 
     # Choose report period
-    report_period = st.radio("Select Report Period:", ["Daily", "Weekly", "Monthly"], index=0, key="report_period")
+    report_period = st.radio("Select Report Period:", ["Daily", "Weekly", "Monthly", "Custom Range"], index=0, key="report_period")
 
-    # Filter sales data based on the selected period
+    # Read the pre-aggregated daily buckets for the selected period
+    now = pd.Timestamp(datetime.now())
+    end_day = now.strftime("%Y-%m-%d")
     if report_period == "Daily":
-        filtered_data = branch_sales_data[branch_sales_data['Time'].str.contains(datetime.now().strftime("%Y-%m-%d"))]
+        start_day = end_day
     elif report_period == "Weekly":
-        filtered_data = branch_sales_data[pd.to_datetime(branch_sales_data['Time']) >= pd.Timestamp(datetime.now()) - pd.Timedelta(days=7)]
-    else:  # Monthly report
-        filtered_data = branch_sales_data[pd.to_datetime(branch_sales_data['Time']).dt.to_period('M') == pd.Timestamp(datetime.now()).to_period('M')]
+        # Both ends are inclusive day buckets, so today and the six days before it
+        start_day = (now - pd.Timedelta(days=6)).strftime("%Y-%m-%d")
+    elif report_period == "Monthly":
+        start_day = now.strftime("%Y-%m-01")
+    else:  # Custom date range
+        date_range = st.date_input("Select date range:", value=(now.date() - timedelta(days=30), now.date()), key="report_range")
+        if len(date_range) != 2:
+            st.info("Please select both a start and an end date.")
+            return
+        start_day, end_day = (day.strftime("%Y-%m-%d") for day in date_range)
+    with db_pool.connection() as conn:
+        filtered_data = load_rollups(conn, branch, start_day=start_day, end_day=end_day)
 
-    # Exclude orders with RM0.00 from revenue calculations
-    filtered_data = filtered_data[filtered_data['Price'] > 0]
+    # Exclude buckets with RM0.00 from revenue calculations
+    filtered_data = filtered_data[filtered_data['Revenue'] > 0]
 
     if not filtered_data.empty:
         # Total Sales Report
-        total_revenue = filtered_data['Price'].sum()
+        total_revenue = filtered_data['Revenue'].sum()
         total_quantity = filtered_data['Quantity'].sum()
         st.markdown(f"<strong style='font-size:18px;'>Total Revenue for {branch}:</strong> RM{total_revenue:.2f}", unsafe_allow_html=True)
         st.markdown(f"<strong style='font-size:18px;'>Total Quantity Sold:</strong> {total_quantity} cups", unsafe_allow_html=True)
@@ -712,44 +467,22 @@ def sales_report():
 
         # Coffee Sales Distribution Pie Chart
         st.markdown(f"<h4 style='text-align: center;'>Coffee Sales Distribution ({branch})</h4>", unsafe_allow_html=True)
-        fig1, ax1 = plt.subplots()
-        ax1.pie(coffee_sales['Quantity'], labels=coffee_sales['Coffee Type'], autopct='%1.1f%%', startangle=90)
-        ax1.axis('equal')
-        st.pyplot(fig1)
-
-        # Ingredient usage calculation based on sales
-        total_beans_used = total_milk_used = total_sugar_used = total_cups_used = 0
-
-        for idx, order in filtered_data.iterrows():
-            coffee_type = order['Coffee Type']
-            size = order['Size']
-
-            # Check if the coffee type and size exist in ingredient_usage
-            if coffee_type in ingredient_usage and size in ingredient_usage[coffee_type]:
-                beans_used = ingredient_usage[coffee_type][size]['coffee_beans'] * order['Quantity']
-                milk_used = ingredient_usage[coffee_type][size]['milk'] * order['Quantity']
-                sugar_used = ingredient_usage[coffee_type][size]['sugar'] * order['Quantity']
-
-                total_beans_used += beans_used
-                total_milk_used += milk_used
-                total_sugar_used += sugar_used
-
-                # Add extra ingredient usage for add-ons
-                if 'Extra sugar' in order['Add-ons']:
-                    total_sugar_used += extra_usage['sugar'] * order['Quantity']
-                if 'Extra milk' in order['Add-ons']:
-                    total_milk_used += extra_usage['milk'] * order['Quantity']
-
-        total_cups_used = filtered_data['Quantity'].sum()
+        coffee_labels = coffee_sales['Coffee Type'].tolist()
+        coffee_quantities = coffee_sales['Quantity'].tolist()
+        st.image(chart_cache.get_or_render(
+            ('sales_pie', tuple(coffee_labels), tuple(coffee_quantities)),
+            lambda: render_sales_pie(coffee_labels, coffee_quantities)
+        ))
+
+        # Ingredient usage calculation based on sales (vectorized over the filtered buckets)
+        usage_totals = usage_table.totals(filtered_data)
+        total_beans_used = usage_totals['coffee_beans']
+        total_milk_used = usage_totals['milk']
+        total_sugar_used = usage_totals['sugar']
+        total_cups_used = usage_totals['cups']
 
         # Inventory cost calculations based on the usage of ingredients
-        branch_inventory = st.session_state['current_inventory']
-        branch_inventory_cost = (
-            (total_beans_used / 100) * restock_prices['coffee_beans'] +
-            (total_milk_used / 100) * restock_prices['milk'] +
-            (total_sugar_used / 100) * restock_prices['sugar'] +
-            total_cups_used * restock_prices['cups']
-        )
+        branch_inventory_cost = restock_cost(usage_totals, restock_prices)
 
         # Calculate total profit
         total_profit = total_revenue - branch_inventory_cost
@@ -766,14 +499,11 @@ def sales_report():
 
         # Stacked Bar Chart for Total Revenue, Inventory Cost, and Profit
         st.markdown(f"<h4 style='text-align: center;'>Revenue, Inventory Cost, and Profit Breakdown ({branch})</h4>", unsafe_allow_html=True)
-        fig, ax = plt.subplots()
-        categories = ['Total Revenue', 'Inventory Cost', 'Profit']
-        values = [total_revenue, branch_inventory_cost, total_profit]
-
-        ax.bar(categories, values, color=['#66B3FF', '#FF9999', '#99FF99'])
-        ax.set_ylabel('Amount (RM)')
-        ax.set_title(f'Financial Overview ({branch})')
-        st.pyplot(fig)
+        values = (round(float(total_revenue), 2), round(branch_inventory_cost, 2), round(float(total_profit), 2))
+        st.image(chart_cache.get_or_render(
+            ('financial_bars', branch) + values,
+            lambda: render_financial_bars(branch, *values)
+        ))
 
         # Display Total Inventory Cost and Profit
         # Correct HTML rendering with calculated data
@@ -784,6 +514,10 @@ def sales_report():
         st.write(f"No sales data available for the selected period at {branch}.")
 
 
+# Orders shown per page in the order history
+HISTORY_PAGE_SIZE = 50
+
+
 #Order History
 def display_order_history():
     st.markdown("<h3>📜 Order History</h3>", unsafe_allow_html=True)
@@ -793,16 +527,29 @@ def display_order_history():
         return
 
     branch = st.session_state['admin_branch']
-    if 'Branch' not in st.session_state.sales_data.columns:
-        st.error("Branch column is missing in sales data.")
-        return
 
-    branch_orders = st.session_state.sales_data[
-        st.session_state.sales_data['Branch'] == branch
-    ]
-
-    if not branch_orders.empty:
-        st.dataframe(branch_orders[['Order Number', 'Customer Name', 'Coffee Type', 'Size', 'Add-ons', 'Price', 'Time', 'Status']])
+    # Restrict the history to a date range and read it from the ledger one page
+    # at a time through the (branch, time) index, so old history never has to
+    # be held in memory
+    today = datetime.now().date()
+    with db_pool.connection() as conn:
+        first_time = first_order_time(conn, branch)
+    first_day = first_time.date() if first_time is not None else today
+    date_range = st.date_input("Show orders between:", value=(first_day, today), key="history_range")
+    if len(date_range) != 2:
+        st.info("Please select both a start and an end date.")
+        return
+    start, end = date_range
+    since, until = start, end + timedelta(days=1)
+    with db_pool.connection() as conn:
+        total = count_orders(conn, branch=branch, since=since, until=until)
+
+    if total:
+        offset = page_controls(f"history_{branch}", total, HISTORY_PAGE_SIZE)
+        with db_pool.connection() as conn:
+            branch_orders = load_orders(conn, branch=branch, since=since, until=until, offset=offset, limit=HISTORY_PAGE_SIZE)
+        history = branch_orders.assign(**{'Pickup Code': [pickup_code(branch, number) for number in branch_orders['Order Number']]})
+        st.dataframe(history[['Order Number', 'Pickup Code', 'Customer Name', 'Coffee Type', 'Size', 'Add-ons', 'Price', 'Time', 'Status']])
     else:
         st.info(f"No orders have been placed for the branch: {branch}.")
 
@@ -832,10 +579,30 @@ def feedback_form():
             'Branch': branch,  # New branch data
             'Time': feedback_time
         }
-        st.session_state.feedback.append(new_feedback)
+        with db_pool.connection() as conn:
+            add_feedback(conn, new_feedback)
         st.success("Thank you for your feedback!")
 
 
+# Display name and unit of every inventory item
+INVENTORY_LABELS = {
+    'coffee_beans': ("Coffee Beans", 'g'),
+    'milk': ("Milk", 'ml'),
+    'sugar': ("Sugar", 'g'),
+    'cups': ("Cups", 'units'),
+}
+
+
+# Hours until an item runs out, for display; None means it isn't being used
+def format_hours_left(hours_left):
+    if hours_left is None:
+        return "No recent use"
+    if hours_left >= 48:
+        return f"{hours_left / 24:.1f} days"
+    minutes = int(hours_left * 60)
+    return f"{minutes // 60} h {minutes % 60} min"
+
+
 def analytics_dashboard():
     st.markdown("<h3 style='color: #3D3D3D;'>📈 Analytics Dashboard</h3>", unsafe_allow_html=True)
     st.write("Real-time stats on orders, inventory, and sales.")
@@ -846,13 +613,13 @@ def analytics_dashboard():
         return
 
     branch = st.session_state['admin_branch']
-    branch_inventory = st.session_state.branch_inventory.get(branch)
+    branch_inventory = service.stock(branch) if branch in FIXED_BRANCHES else None
 
     if branch_inventory:
         # Display the order count and total revenue for the selected branch
-        branch_sales_data = st.session_state.sales_data[st.session_state.sales_data['Branch'] == branch]
-        total_revenue = branch_sales_data['Price'].sum()
-        st.metric(label="Total Orders", value=len(branch_sales_data))
+        with db_pool.connection() as conn:
+            total_orders, total_revenue = rollup_totals(conn, branch)
+        st.metric(label="Total Orders", value=total_orders)
         st.metric(label="Total Revenue", value=f"RM{total_revenue:.2f}")
 
         # Display inventory for the selected branch
@@ -877,18 +644,26 @@ def analytics_dashboard():
             unsafe_allow_html=True
         )
 
-        # Estimate how many cups can be made with the current inventory for the selected branch
-        average_beans_per_cup = 12  # g
-        average_milk_per_cup = 80   # ml
-        average_sugar_per_cup = 5   # g
-
-        max_cups_beans = branch_inventory['coffee_beans'] // average_beans_per_cup
-        max_cups_milk = branch_inventory['milk'] // average_milk_per_cup
-        max_cups_sugar = branch_inventory['sugar'] // average_sugar_per_cup
-        max_cups = min(max_cups_beans, max_cups_milk, max_cups_sugar, branch_inventory['cups'])
+        # Estimate how many cups can be made with the current inventory at the
+        # branch's recent mix of coffees, sizes and add-ons, and when each item
+        # runs out at the current pace. Both come from moving averages updated on
+        # every order commit, so they cost the same at any order volume.
+        forecast = service.stock_forecast(branch)
+        max_cups = forecast['cups_remaining']
 
         st.markdown(f"☕ **Estimated Cups You Can Make at {branch}**: {max_cups} cups")
-        st.write(f"- Based on current inventory, you can make approximately **{max_cups}** more cups of coffee at {branch}.")
+        st.write(f"- Based on current inventory and recent sales, you can make approximately **{max_cups}** more cups of coffee at {branch}.")
+
+        st.markdown("<h5 style='color: #3D3D3D;'>⏳ Time to Stockout</h5>", unsafe_allow_html=True)
+        st.dataframe(pd.DataFrame([
+            {
+                'Item': f"{label} ({unit})",
+                'In Stock': branch_inventory[item],
+                'Use per Hour': round(forecast['items'][item]['per_hour'], 1),
+                'Runs Out In': format_hours_left(forecast['items'][item]['hours_left']),
+            }
+            for item, (label, unit) in INVENTORY_LABELS.items()
+        ]), hide_index=True)
 
         # Inventory Health Alerts for the selected branch
         st.markdown("<h5 style='color: #FF4136;'>⚠️ Inventory Health Alerts</h5>", unsafe_allow_html=True)
@@ -924,16 +699,18 @@ def customer_interface():
     st.sidebar.title("Customer Menu")
     selection = st.sidebar.radio("Choose a page:", ["Coffee Menu", "Order Coffee", "Order Status Dashboard", "Feedback", "Loyalty Program",])
 
-    if selection == "Coffee Menu":
-        display_menu()
-    elif selection == "Order Coffee":
-        take_order()
-    elif selection == "Order Status Dashboard":
-        display_order_status()
-    elif selection == "Feedback":
-        feedback_form()
-    elif selection == "Loyalty Program":
-        loyalty_program()
+    # Every render of the page is timed for the admin Performance page
+    with timings.measure(PAGE, f"Customer: {selection}"):
+        if selection == "Coffee Menu":
+            display_menu()
+        elif selection == "Order Coffee":
+            take_order()
+        elif selection == "Order Status Dashboard":
+            display_order_status()
+        elif selection == "Feedback":
+            feedback_form()
+        elif selection == "Loyalty Program":
+            loyalty_program()
 
 
 
@@ -942,36 +719,35 @@ def customer_interface():
 def display_order_status():
     st.markdown("<h3 style='color: #3D3D3D;'>📊 Order Status Dashboard</h3>", unsafe_allow_html=True)
     
-    # Display orders that are being processed
-    processing_orders = st.session_state.sales_data[st.session_state.sales_data['Status'] == 'Being Processed']
-    ready_orders = st.session_state.sales_data[st.session_state.sales_data['Status'] == 'Ready']
+    # Both lists are windowed, so only the visible page of each queue is rendered
+    processing_total = service.queue_count(PROCESSING)
+    ready_total = service.queue_count(READY)
 
     # Orders being processed
     st.subheader("Orders Being Processed")
-    if not processing_orders.empty:
-        st.write(processing_orders[['Order Number', 'Customer Name', 'Coffee Type', 'Time']])
+    if processing_total:
+        offset = page_controls("processing", processing_total, ORDER_PAGE_SIZE)
+        processing_orders = service.queue_page(PROCESSING, offset, ORDER_PAGE_SIZE)
+        st.write(pd.DataFrame(processing_orders)[['Pickup Code', 'Customer Name', 'Coffee Type', 'Time', 'Branch']])
     else:
         st.write("No orders are being processed.")
 
     # Orders ready for pickup with formatted boxes
     st.subheader("Orders Ready for Pickup")
-    if not ready_orders.empty:
-        for idx, order in ready_orders.iterrows():
-            st.markdown(
-                f"""
-                <div style='border: 1px solid #d9d9d9; border-radius: 10px; padding: 15px; margin-bottom: 10px; background-color: #f9f9f9;'>
-                    <strong>Order #{order['Order Number']}</strong><br>
-                    <strong>Customer:</strong> {order['Customer Name']}<br>
-                    <strong>Coffee:</strong> {order['Coffee Type']} ({order['Size']})<br>
-                    <strong>Add-ons:</strong> {order['Add-ons']}<br>
-                    <strong>Order Time:</strong> {order['Time']}<br>
-                </div>
-                """, unsafe_allow_html=True
-            )
-            if st.button(f"Picked Up #{order['Order Number']}", key=f"pickup_{order['Order Number']}"):
-                # Remove the order from the sales data by updating the status
-                st.session_state.sales_data.drop(idx, inplace=True)
-                st.success(f"Order #{order['Order Number']} has been picked up!")
+    if ready_total:
+        offset = page_controls("pickup", ready_total, ORDER_PAGE_SIZE, shortcuts=True)
+        ready_orders = service.queue_page(READY, offset, ORDER_PAGE_SIZE)
+        st.markdown(ORDER_CARD.render_all(order_card_fields(order) for order in ready_orders), unsafe_allow_html=True)
+
+        columns = st.columns(3)
+        for i, order in enumerate(ready_orders):
+            if columns[i % 3].button(f"Picked Up #{order['Pickup Code']}", key=f"pickup_{order['Branch']}_{order['Order Number']}",
+                                     shortcut=str(i + 1)):
+                # Mark the order as picked up so it leaves the pickup list but stays in the history
+                if service.pickup(order['Branch'], order['Order Number']):
+                    st.success(f"Order #{order['Pickup Code']} has been picked up!")
+                else:
+                    st.warning(f"Order #{order['Pickup Code']} is no longer waiting for pickup.")
     else:
         st.write("No orders are ready for pickup.")
 
@@ -986,36 +762,35 @@ def manage_coupons():
 
     if st.button("Create Coupon"):
         if coupon_code and discount_amount > 0:
-            new_coupon = {
-                'Code': coupon_code,
-                'Discount': discount_amount,
-                'Expiration Date': expiration_date
-            }
-            st.session_state.coupons.append(new_coupon)
+            with db_pool.connection() as conn:
+                add_coupon(conn, coupon_code, discount_amount, expiration_date)
             st.success(f"Coupon '{coupon_code}' created successfully!")
         else:
             st.error("Please enter a valid coupon code and discount amount.")
 
+    # Expired codes are dropped in bulk before listing what is left
+    with db_pool.connection() as conn:
+        prune_expired_coupons(conn, datetime.now().date())
+        coupons = load_coupons(conn)
+        usage = load_coupon_usage(conn)
+
     # Display existing coupons
-    if st.session_state.coupons:
+    if not coupons.empty:
         st.markdown("<h4>Existing Coupons</h4>", unsafe_allow_html=True)
-        for coupon in st.session_state.coupons:
-            st.markdown(f"- **{coupon['Code']}**: RM{coupon['Discount']} (Expires on {coupon['Expiration Date']})")
+        st.dataframe(coupons.style.format({'Discount': 'RM{:.2f}'}), hide_index=True)
     else:
         st.write("No coupons available.")
 
     # Display coupon usage history in admin panel
     st.markdown("<h4>Coupon Usage History</h4>", unsafe_allow_html=True)
 
-    # Display usage history table
-    if 'coupon_usage_history' in st.session_state and st.session_state.coupon_usage_history:
-        usage_df = pd.DataFrame(st.session_state.coupon_usage_history)
-        st.dataframe(usage_df)
+    # Display the most recent redemptions
+    if not usage.empty:
+        st.dataframe(usage.style.format({'Discount': 'RM{:.2f}'}), hide_index=True)
     else:
         st.write("No coupons have been used yet.")
 
 # Taking Order
-from datetime import datetime
 
 def take_order():
     st.markdown("<h3 style='color: #3D3D3D;'>📋 Place Your Coffee Order</h3>", unsafe_allow_html=True)
@@ -1049,24 +824,12 @@ def take_order():
                     ['Extra sugar', 'Extra milk'], key=f"addons_{coffee_type}"
                 )
 
-                # Real-time calculation of price
-                base_price = coffee_menu[coffee_type][size] * quantity
-                add_on_price = sum(add_on_prices[add_on] for add_on in add_ons) * quantity
-                total_price = base_price + add_on_price
-                final_price = total_price
-
-                # Apply daily special offer
-                #daily_special = get_daily_special()
-                #daily_offer = 0
-                #if daily_special.get("coffee") is None or daily_special["coffee"] == coffee_type:
-                #    daily_offer = daily_special["discount"] * base_price
-
-                # Calculate final price with daily special
-                #final_price = total_price
+                # Real-time calculation of price; the daily special is applied per line
+                # when the whole cart is priced below
+                final_price = pricing_engine.line_price(coffee_type, size, quantity, add_ons)
 
                 # Calculate preparation time based on size and add-ons
-                base_prep_time = {'small': 120, 'medium': 180, 'large': 300}[size]  # Time in seconds
-                total_prep_time = base_prep_time + (len(add_ons) * 30)
+                total_prep_time = prep_time(size, add_ons)  # Time in seconds
 
                 # Add Coffee Button
                 if st.form_submit_button("Add Coffee"):
@@ -1092,60 +855,36 @@ def take_order():
                     f"(Prep Time: {order['Prep Time']} seconds)"
                 )
 
-            # Calculate the total for all items
-            total_order_price = sum(order["Price"] for order in st.session_state["temp_orders"])
-            st.markdown(f"**Total Price Before Discounts:** RM{total_order_price:.2f}")
-
-            # Apply daily special offer
-            daily_special = get_daily_special()
-            daily_offer = 0
-            if daily_special.get("coffee") is None or daily_special["coffee"] == coffee_type:
-                daily_offer = daily_special["discount"] * final_price
-
             # Coupon code input (Optional)
             coupon_code = st.text_input("Enter Coupon Code (optional):")
 
-            discount = 0  # Default discount value
-            if coupon_code:
-                coupon_found = False
-                for coupon in st.session_state.coupons:
-                    if coupon['Code'] == coupon_code:
-                        if datetime.strptime(coupon['Expiration Date'].strftime('%Y-%m-%d'), '%Y-%m-%d') >= datetime.now():
-                            discount = coupon['Discount']
-                            st.success(f"RM{discount:.2f} discount applied!")  # Show success message for coupon application
-                            coupon_found = True
-                            break
-                if not coupon_found:
-                    st.error("Invalid coupon or coupon has expired.")
+            # The balance caps the points input; the cart is quoted once the
+            # points are chosen
+            customer_id = current_customer_id()
+            points_balance = service.points_balance(customer_id)
 
             # Redeem Loyalty Points: Customer can enter how many points to redeem
             points_to_redeem = st.number_input(
-                "Enter Loyalty Points to Redeem (1 point = RM0.50 discount)",
-                min_value=0, max_value=st.session_state['loyalty_points'],
+                f"Enter Loyalty Points to Redeem (1 point = RM{POINT_VALUE:.2f} discount)",
+                min_value=0, max_value=points_balance,
                 step=1, key="redeem_points"
             )
 
-            # Calculate the discount for loyalty points redemption
-            loyalty_discount = points_to_redeem * 0.50
+            # Every figure below is computed by the service: the daily special on every
+            # line it covers, the coupon, the points and the wait at the busiest branch
+            quote = service.quote(st.session_state["temp_orders"], coupon_code, customer_id, points_to_redeem)
+            st.markdown(f"**Total Price Before Discounts:** RM{quote['subtotal']:.2f}")
+            if coupon_code:
+                if quote['coupon_discount'] is not None:
+                    st.success(f"RM{quote['coupon_discount']:.2f} discount applied!")  # Show success message for coupon application
+                else:
+                    st.error("Invalid coupon or coupon has expired.")
 
             # Final total price after all discounts
-            total_price_after_discounts = max(0.00, total_order_price - daily_offer - discount - loyalty_discount)
+            total_price_after_discounts = quote['total']
             st.markdown(f"**Total Price After Discounts:** RM{total_price_after_discounts:.2f}")
 
-            # Calculate waiting time based on orders ahead
-            orders_ahead = len(st.session_state.sales_data[st.session_state.sales_data['Status'] == 'Being Processed'])
-            total_waiting_time = 0
-
-            for _, order in st.session_state.sales_data[st.session_state.sales_data['Status'] == 'Being Processed'].iterrows():
-                order_size = order['Size']
-                order_add_ons = order['Add-ons'].split(", ")
-
-                prep_time = {'small': 120, 'medium': 180, 'large': 300}[order_size]
-                total_waiting_time += prep_time + (len(order_add_ons) * 30)
-
-            # Add the preparation time for the current order
-            total_waiting_time += sum(order["Prep Time"] for order in st.session_state["temp_orders"])
-            minutes, seconds = divmod(total_waiting_time, 60)
+            minutes, seconds = divmod(quote['wait_seconds'], 60)
 
             st.markdown(f"**Estimated Waiting Time:** {minutes} minutes and {seconds} seconds")
 
@@ -1178,77 +917,83 @@ def take_order():
             # Confirm Order Button
             if st.button("Confirm Order and Pay"):
                 if valid_payment:
-                    order_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    for order in st.session_state["temp_orders"]:
-                        # Update inventory for the selected branch
-                        coffee_type = order["Coffee Type"]
-                        size = order["Size"]
-                        quantity = order["Quantity"]
-                        branch = order["Branch"]
-                        add_ons = order["Add-ons"].split(', ')
-                        ingredients = ingredient_usage[coffee_type][size]
-
-                        if check_inventory(branch, coffee_type, size, quantity, add_ons):
-                            # Store the new order details
-                            new_order = {
-                                'Order Number': generate_unique_order_number(),
-                                'Customer Name': customer_name,
-                                'Coffee Type': coffee_type,
-                                'Quantity': quantity,
-                                'Size': size,
-                                'Add-ons': ', '.join(add_ons),
-                                'Price': order["Price"],
-                                'Time': order_time,
-                                'Status': 'Being Processed',
-                                'Branch': branch
-                            }
-
-                            st.session_state.sales_data = pd.concat(
-                                [st.session_state.sales_data, pd.DataFrame([new_order])],
-                                ignore_index=True
-                            )
-
-                            # Deduct inventory
-                            st.session_state.branch_inventory[branch]['coffee_beans'] -= ingredients['coffee_beans'] * quantity
-                            st.session_state.branch_inventory[branch]['milk'] -= ingredients['milk'] * quantity + (
-                                extra_usage['milk'] if 'Extra milk' in add_ons else 0
-                            )
-                            st.session_state.branch_inventory[branch]['sugar'] -= ingredients['sugar'] * quantity + (
-                                extra_usage['sugar'] if 'Extra sugar' in add_ons else 0
-                            )
-                            st.session_state.branch_inventory[branch]['cups'] -= quantity
-
-                    st.success("Order placed successfully!")
-                    st.session_state["temp_orders"] = []  # Clear temporary orders
+                    # The service validates and deducts stock for the whole cart at once
+                    # and writes every line in one transaction, so a cart is never
+                    # half-placed. Loyalty points are redeemed and earned in the same
+                    # transaction.
+                    try:
+                        placed_orders, shortage, quote = service.place_order(
+                            customer_name, st.session_state["temp_orders"], coupon_code or None,
+                            customer_id, points_to_redeem
+                        )
+                    except CouponUnavailable:
+                        st.error("The coupon is no longer valid. Nothing has been charged.")
+                        return
+                    except InsufficientPoints:
+                        st.error("Your loyalty points balance has changed. Please review the points to redeem.")
+                        return
+
+                    if shortage:
+                        short_branch, short_item = shortage
+                        if short_item == 'cups':
+                            st.error(f"Sorry, {short_branch} is out of cups to serve your order. Nothing has been charged.")
+                        else:
+                            st.error(f"Sorry, {short_branch} doesn't have enough {short_item.replace('_', ' ')} for your order. Nothing has been charged.")
+                    else:
+                        st.success("Order placed successfully!")
+                        if customer_id is not None and points_earned(quote['total']):
+                            st.write(f"🎁 You earned {points_earned(quote['total'])} loyalty points!")
+                        st.session_state["temp_orders"] = []  # Clear temporary orders
                 else:
                     st.error("Payment could not be processed due to invalid payment details. Please try again.")
     else:
         st.warning("Please enter your name to proceed.")
 
 
+# customers.id of the logged-in customer, looked up once per session;
+# None when the user is not a registered customer
+def current_customer_id():
+    if 'customer_id' not in st.session_state:
+        with db_pool.connection() as conn:
+            row = conn.execute("SELECT id FROM customers WHERE username=?", (st.session_state['user'],)).fetchone()
+        st.session_state['customer_id'] = row[0] if row else None
+    return st.session_state['customer_id']
+
+
+# Loyalty history entries shown per page
+LOYALTY_PAGE_SIZE = 10
+
+
 def loyalty_program():
     st.markdown("<h3 style='color: #3D3D3D;'>🎁 Loyalty Program</h3>", unsafe_allow_html=True)
-    
-    # Display current loyalty points
-    st.write(f"**Your current loyalty points: {st.session_state['loyalty_points']}**")
-    
-    # Display loyalty points earning history
-    if 'loyalty_points_history' in st.session_state and st.session_state['loyalty_points_history']:
+
+    customer_id = current_customer_id()
+    if customer_id is None:
+        st.info("Loyalty points are available to registered customers.")
+        return
+
+    # Display current loyalty points, read from the materialized balance
+    with db_pool.connection() as conn:
+        balance = loyalty_balance(conn, customer_id)
+        earned_total = count_loyalty_history(conn, customer_id, EARNED)
+        redeemed_total = count_loyalty_history(conn, customer_id, REDEEMED)
+    st.write(f"**Your current loyalty points: {balance}**")
+
+    # Display loyalty points earning history, one page at a time
+    if earned_total:
         st.markdown("<h4 style='color: #3D3D3D;'>Loyalty Points Earned History</h4>", unsafe_allow_html=True)
-        
-        # Convert the earned points history into a DataFrame for display
-        earned_df = pd.DataFrame(st.session_state['loyalty_points_history'])
-        st.dataframe(earned_df)
+        offset = page_controls("loyalty_earned", earned_total, LOYALTY_PAGE_SIZE)
+        with db_pool.connection() as conn:
+            st.dataframe(load_loyalty_history(conn, customer_id, EARNED, offset, LOYALTY_PAGE_SIZE), hide_index=True)
     else:
         st.write("No loyalty points earned history available.")
-    
-    # Display loyalty points redemption history
-    if 'loyalty_redemptions' in st.session_state and st.session_state['loyalty_redemptions']:
-        st.markdown("<h4 style='color: #3D3D3D;'>Loyalty Points Redemption History</h4>", unsafe_allow_html=True)
 
-        # Convert the redemption history into a DataFrame for display
-        redemption_df = pd.DataFrame(st.session_state['loyalty_redemptions'])
-        st.dataframe(redemption_df)
+    # Display loyalty points redemption history, one page at a time
+    if redeemed_total:
+        st.markdown("<h4 style='color: #3D3D3D;'>Loyalty Points Redemption History</h4>", unsafe_allow_html=True)
+        offset = page_controls("loyalty_redeemed", redeemed_total, LOYALTY_PAGE_SIZE)
+        with db_pool.connection() as conn:
+            st.dataframe(load_loyalty_history(conn, customer_id, REDEEMED, offset, LOYALTY_PAGE_SIZE), hide_index=True)
     else:
         st.write("No loyalty points redemption history available.")
 
@@ -1284,70 +1029,67 @@ def generate_invoice(order_number, customer_name, coffee_type, size, add_ons, fi
 
 
 
-# Check Inventory Based on Coffee Type, Size, and Quantity
-def check_inventory(branch, coffee_type, size, quantity, add_ons):
-    ingredients = ingredient_usage[coffee_type][size]  # Retrieve ingredients here
-    branch_inventory = st.session_state.branch_inventory[branch]
-
-    if branch_inventory['coffee_beans'] < ingredients['coffee_beans'] * quantity:
-        st.error(f"Sorry, {coffee_type} ({size}) is currently out of stock due to insufficient coffee beans.")
-        return False
-    if branch_inventory['milk'] < (ingredients['milk'] * quantity + (extra_usage['milk'] * quantity if 'Extra milk' in add_ons else 0)):
-        st.error(f"Sorry, {coffee_type} ({size}) is currently out of stock due to insufficient milk.")
-        return False
-    if branch_inventory['sugar'] < (ingredients['sugar'] * quantity + (extra_usage['sugar'] * quantity if 'Extra sugar' in add_ons else 0)):
-        st.error(f"Sorry, {coffee_type} ({size}) is currently out of stock due to insufficient sugar.")
-        return False
-    if branch_inventory['cups'] < quantity:
-        st.error(f"Sorry, we are out of cups to serve {coffee_type} ({size}).")
-        return False
-    return True
-
-
-
-# Update Inventory After Successful Order
-def update_inventory(branch, coffee_type, size, quantity, add_ons):
-    ingredients = ingredient_usage[coffee_type][size]
-    branch_inventory = st.session_state.branch_inventory[branch]
+# Feedback comments shown per page in the admin section
+FEEDBACK_PAGE_SIZE = 10
 
-    branch_inventory['coffee_beans'] -= ingredients['coffee_beans'] * quantity
-    branch_inventory['milk'] -= ingredients['milk'] * quantity
-    if 'Extra milk' in add_ons:
-        branch_inventory['milk'] -= extra_usage['milk'] * quantity  # Deduct extra milk
-    if 'Extra sugar' in add_ons:
-        branch_inventory['sugar'] -= (ingredients['sugar'] * quantity + extra_usage['sugar'] * quantity)  # Deduct extra sugar
-    else:
-        branch_inventory['sugar'] -= ingredients['sugar'] * quantity  # Deduct regular sugar
-    branch_inventory['cups'] -= quantity
-    st.write("📊 Inventory updated.")
-
-
-if 'feedback' not in st.session_state:
-    st.session_state.feedback = []
 
-# Function to display customer feedback in the admin section
+# Function to display customer feedback in the admin section.
+# Ratings come from the running statistics kept on insert and comments are
+# read one page at a time, so the page never scans the branch's feedback.
 def display_feedback():
     st.markdown("<h3 style='color: #3D3D3D;'>📋 Customer Feedback</h3>", unsafe_allow_html=True)
 
     if 'admin_branch' in st.session_state and st.session_state['admin_branch']:
-        branch_feedback = [
-            fb for fb in st.session_state.feedback if fb['Branch'] == st.session_state['admin_branch']
-        ]
+        branch = st.session_state['admin_branch']
+        with db_pool.connection() as conn:
+            reviews, coffee_average, service_average = feedback_totals(conn, branch)
+            stats = feedback_stats(conn, branch) if reviews else None
+
+        if reviews:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Reviews", reviews)
+            col2.metric("Average Coffee Rating", f"{coffee_average:.2f} / 5")
+            col3.metric("Average Service Rating", f"{service_average:.2f} / 5")
+            st.dataframe(stats.style.format({'Coffee Rating': '{:.2f}', 'Service Rating': '{:.2f}'}), hide_index=True)
+
+            # Full-text search over the branch's comments, narrowed by coffee and ratings
+            st.markdown("#### 🔍 Search Comments")
+            search_col, coffee_col = st.columns([2, 1])
+            search_text = search_col.text_input("Words to look for", key="feedback_search")
+            coffee_choice = coffee_col.selectbox("Coffee", ["All"] + list(coffee_menu.keys()), key="feedback_search_coffee")
+            coffee_col1, service_col1 = st.columns(2)
+            coffee_ratings = coffee_col1.slider("Coffee Rating", 1, 5, (1, 5), key="feedback_search_coffee_rating")
+            service_ratings = service_col1.slider("Service Rating", 1, 5, (1, 5), key="feedback_search_service_rating")
+            search = {
+                'coffee': None if coffee_choice == "All" else coffee_choice,
+                'coffee_ratings': coffee_ratings,
+                'service_ratings': service_ratings,
+            }
 
-        if branch_feedback:
-            for fb in branch_feedback:
-                st.markdown(
-                    f"""
-                    <div style='border: 1px solid #d9d9d9; border-radius: 10px; padding: 15px; margin-bottom: 15px; background-color: #f9f9f9;'>
-                        <h4 style='color: #333;'>Customer Name: {fb['Name']}</h4>
-                        <p><strong>Coffee Purchased:</strong> {fb['Coffee Purchased']}</p>
-                        <p><strong>Coffee Rating:</strong> {'⭐' * fb['Coffee Rating']} ({fb['Coffee Rating']}/5)</p>
-                        <p><strong>Service Rating:</strong> {'⭐' * fb['Service Rating']} ({fb['Service Rating']}/5)</p>
-                        <p><strong>Comments:</strong> <span style='color: #666;'>{fb['Additional Feedback']}</span></p>
-                        <p style='color: #999; font-size: 0.85em;'>Submitted on {fb['Time']}</p>
-                    </div>
-                    """, unsafe_allow_html=True
-                )
+            if search_text.strip():
+                with db_pool.connection() as conn:
+                    matches = count_feedback_matches(conn, branch, search_text, **search)
+                if not matches:
+                    st.info("No comments match your search.")
+                    return
+                st.write(f"{matches} matching comments, best matches first:")
+                offset = page_controls(f"feedback_search_{branch}", matches, FEEDBACK_PAGE_SIZE)
+                with db_pool.connection() as conn:
+                    branch_feedback = search_feedback(conn, branch, search_text, offset, FEEDBACK_PAGE_SIZE, **search)
+            else:
+                offset = page_controls(f"feedback_{branch}", reviews, FEEDBACK_PAGE_SIZE)
+                with db_pool.connection() as conn:
+                    branch_feedback = load_feedback_page(conn, branch, offset, FEEDBACK_PAGE_SIZE)
+            st.markdown(FEEDBACK_CARD.render_all({
+                'name': fb['Name'],
+                'coffee': fb['Coffee Purchased'],
+                'coffee_stars': '⭐' * fb['Coffee Rating'],
+                'coffee_rating': fb['Coffee Rating'],
+                'service_stars': '⭐' * fb['Service Rating'],
+                'service_rating': fb['Service Rating'],
+                'comments': fb['Additional Feedback'],
+                'time': fb['Time'],
+            } for fb in branch_feedback), unsafe_allow_html=True)
         else:
             st.write(f"No feedback available for {st.session_state['admin_branch']} branch.")
     else:
@@ -1359,7 +1101,7 @@ if 'current_inventory' not in st.session_state:
 
 # Ensure branch selection updates the current inventory dynamically
 def update_current_inventory(branch):
-    st.session_state['current_inventory'] = st.session_state.branch_inventory[branch]
+    st.session_state['current_inventory'] = service.stock(branch)
 
 # Branch Inventory Display
 def display_branch_inventory():
@@ -1390,7 +1132,7 @@ def display_branch_inventory():
         # Restock button
         if st.button(f"Restock {item_to_restock}"):
             if restock_amount > 0:
-                inventory[item_to_restock] += restock_amount
+                service.restock(branch, item_to_restock, restock_amount)
                 st.session_state.restock_history.append({
                     'Branch': branch,
                     'Item': item_to_restock,
@@ -1411,19 +1153,6 @@ def calculate_restock_cost(item, amount):
         return (amount / 100) * cost_per_unit
     return amount * cost_per_unit
 
-# Update inventory usage dynamically
-def update_inventory_usage(coffee_type, size, quantity, add_ons):
-    branch = st.session_state['admin_branch']
-    inventory = st.session_state.branch_inventory[branch]
-    usage = ingredient_usage[coffee_type][size]
-
-    inventory['coffee_beans'] -= usage['coffee_beans'] * quantity
-    inventory['milk'] -= usage['milk'] * quantity + (extra_usage['milk'] * quantity if 'Extra milk' in add_ons else 0)
-    inventory['sugar'] -= usage['sugar'] * quantity + (extra_usage['sugar'] * quantity if 'Extra sugar' in add_ons else 0)
-    inventory['cups'] -= quantity
-
-
-
 def admin_interface():
     st.sidebar.title("Administration")
 
@@ -1442,7 +1171,7 @@ def admin_interface():
     st.sidebar.markdown(f"**Selected Branch:** {st.session_state['admin_branch']}")
 
     # Admin Page Selection
-    selection = st.sidebar.radio("Choose a page:", [
+    pages = [
         "Branch Inventory", 
         "Sales Report", 
         "Analytics Dashboard", 
@@ -1450,24 +1179,57 @@ def admin_interface():
         "Kitchen Orders", 
         "Manage Coupons", 
         "Order History"
-    ])
-
-    # Page Navigation
-    if selection == "Branch Inventory":
-        display_branch_inventory()
-    elif selection == "Sales Report":
-        sales_report()
-    elif selection == "Analytics Dashboard":
-        analytics_dashboard()
-    elif selection == "Feedback":
-        display_feedback()
-    elif selection == "Kitchen Orders":
-        display_kitchen_orders()
-    elif selection == "Manage Coupons":
-        manage_coupons()
-    elif selection == "Order History":
-        display_order_history()
-
+    ]
+    # The Performance page is hidden unless the app is opened with ?perf=1
+    if st.query_params.get("perf"):
+        pages.append("Performance")
+    selection = st.sidebar.radio("Choose a page:", pages)
+
+    # Page Navigation; every render of the page is timed for the Performance page
+    with timings.measure(PAGE, f"Admin: {selection}"):
+        if selection == "Branch Inventory":
+            display_branch_inventory()
+        elif selection == "Sales Report":
+            sales_report()
+        elif selection == "Analytics Dashboard":
+            analytics_dashboard()
+        elif selection == "Feedback":
+            display_feedback()
+        elif selection == "Kitchen Orders":
+            display_kitchen_orders()
+        elif selection == "Manage Coupons":
+            manage_coupons()
+        elif selection == "Order History":
+            display_order_history()
+        elif selection == "Performance":
+            display_performance()
+
+
+
+# Render times of every page and timed helper in this process, from the
+# per-process ring buffers, plus the cProfile report of one opted-in rerun
+def display_performance():
+    st.markdown("<h3 style='color: #3D3D3D;'>⏱️ Performance</h3>", unsafe_allow_html=True)
+    st.write(f"Render times of the last {timings.capacity} calls of each page and timed function in this server process.")
+
+    summary = timings.summary()
+    if summary.empty:
+        st.info("No timings recorded yet.")
+    else:
+        st.dataframe(summary.round(2), hide_index=True)
+    if st.button("Clear Timings"):
+        timings.clear()
+        st.rerun()
+
+    st.markdown("<h4 style='color: #3D3D3D;'>Profile a Rerun</h4>", unsafe_allow_html=True)
+    st.write("Profiles the next rerun of this session with cProfile, e.g. after switching to the page to inspect.")
+    if st.button("Profile Next Rerun"):
+        st.session_state['profile_next_rerun'] = True
+        st.success("The next rerun will be profiled.")
+    if 'last_profile' in st.session_state:
+        profiled_at, report = st.session_state['last_profile']
+        st.caption(f"Profile captured at {profiled_at}")
+        st.code(report or "Another profiler was active, so the rerun could not be profiled.", language=None)
 
 
 # Main content function
@@ -1484,7 +1246,14 @@ def main_content():
 
 # Call the authentication and main content functions
 if __name__ == "__main__":
+    # Styles for every card view, sent once per rerun as a single element
+    st.markdown(STYLESHEET, unsafe_allow_html=True)
     authenticate_user()
-    main_content()
+    # A rerun the admin opted into on the Performance page runs under cProfile
+    if st.session_state.pop('profile_next_rerun', False):
+        _, report = profile_call(main_content)
+        st.session_state['last_profile'] = (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), report)
+    else:
+        main_content()
 
 
@@ -0,0 +1,234 @@
+# Headless benchmark of the app's hot paths under synthetic traffic.
+#
+# Drives the same CoffeeShopService calls the Streamlit views make, without
+# Streamlit:
+#
+#   order      quote and place_order for a 1-4 line cart (take_order's
+#              checkout and confirm button)
+#   inventory  a branch's stock levels and stockout forecast (inventory page)
+#   kitchen    one page of a branch's kitchen queue plus marking an order ready
+#              (display_kitchen_orders)
+#   pickup     one page of the pickup list plus a pickup (display_order_status)
+#   report     a daily, weekly or monthly sales report computation (sales_report)
+#
+# The ledger is first filled with --orders historical orders spread over the
+# last 90 days and the service is started on it, then --ops operations are drawn from a seeded mix across
+# FIXED_BRANCHES and the coffee_menu. Latency percentiles and throughput per
+# operation are written as JSON, so runs of different releases can be diffed.
+# Run from the repository root:
+#
+#     python benchmarks/bench_paths.py [--orders N] [--ops N] [--seed N] [--output results.json]
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from muglife.db import ConnectionPool
+from muglife.kitchen import PICKED_UP, PROCESSING, READY, prep_time
+from muglife.ledger import append_orders, init_ledger
+from muglife.menu import FIXED_BRANCHES, coffee_menu, pricing_engine, restock_prices, usage_table
+from muglife.order_numbers import SEQUENCE_SPAN, init_order_numbers
+from muglife.rollups import load_rollups
+from muglife.service import CoffeeShopService
+from muglife.usage import restock_cost
+
+# Relative frequency of each operation in the traffic mix
+MIX = {'order': 40, 'inventory': 20, 'kitchen': 20, 'pickup': 15, 'report': 5}
+
+# Orders shown per page on the kitchen and pickup screens
+PAGE_SIZE = 9
+
+# Historical orders still in the kitchen when the run starts
+ACTIVE_BACKLOG = 200
+
+HISTORY_DAYS = 90
+PREFILL_CHUNK = 50_000
+
+ADD_ON_CHOICES = ['None', 'Extra sugar', 'Extra milk', 'Extra sugar, Extra milk']
+SIZES = ['small', 'medium', 'large']
+
+# Enough stock that no cart is ever rejected during a run
+BENCH_STOCK = {'coffee_beans': 10 ** 12, 'milk': 10 ** 12, 'sugar': 10 ** 12, 'cups': 10 ** 12}
+
+
+def random_line(rng):
+    coffee = rng.choice(list(coffee_menu))
+    size = rng.choice(SIZES)
+    quantity = rng.randint(1, 3)
+    add_ons = rng.choice(ADD_ON_CHOICES)
+    return {
+        'Coffee Type': coffee,
+        'Size': size,
+        'Quantity': quantity,
+        'Add-ons': add_ons,
+        'Price': pricing_engine.line_price(coffee, size, quantity, add_ons),
+        'Branch': rng.choice(FIXED_BRANCHES),
+        'Prep Time': prep_time(size, add_ons),
+    }
+
+
+# Write `count` orders over the last HISTORY_DAYS days (today excluded, so they
+# never collide with the allocator's numbers), the newest still in the kitchen
+def prefill(pool, rng, count, today):
+    first_day = today - timedelta(days=HISTORY_DAYS)
+    sequences = {}
+    written = 0
+    while written < count:
+        chunk = []
+        for i in range(written, min(count, written + PREFILL_CHUNK)):
+            line = random_line(rng)
+            order_time = first_day + timedelta(seconds=int(i * HISTORY_DAYS * 86400 / count))
+            key = (line['Branch'], order_time.date())
+            sequences[key] = sequences.get(key, 0) + 1
+            remaining = count - i
+            status = PROCESSING if remaining <= ACTIVE_BACKLOG // 2 else READY if remaining <= ACTIVE_BACKLOG else PICKED_UP
+            chunk.append({
+                'Order Number': int(order_time.strftime('%Y%m%d')) * SEQUENCE_SPAN + sequences[key],
+                'Customer Name': f'Customer {i % 5000}',
+                'Coffee Type': line['Coffee Type'],
+                'Quantity': line['Quantity'],
+                'Size': line['Size'],
+                'Add-ons': line['Add-ons'],
+                'Price': line['Price'],
+                'Time': order_time,
+                'Status': status,
+                'Branch': line['Branch'],
+            })
+        with pool.connection() as conn:
+            append_orders(conn, chunk)
+        written += len(chunk)
+        print(f'  prefilled {written}/{count} orders', file=sys.stderr)
+
+
+class Bench:
+    def __init__(self, service, rng):
+        self.service = service
+        self.rng = rng
+
+    def order(self):
+        cart = [random_line(self.rng) for _ in range(self.rng.randint(1, 4))]
+        self.service.quote(cart)
+        self.service.place_order('Bench Customer', cart)
+
+    def inventory_check(self):
+        branch = self.rng.choice(FIXED_BRANCHES)
+        self.service.stock(branch)
+        self.service.stock_forecast(branch)
+
+    def kitchen_page(self):
+        branch = self.rng.choice(FIXED_BRANCHES)
+        self.service.queue_count(PROCESSING, branch)
+        page = self.service.queue_page(PROCESSING, 0, PAGE_SIZE, branch)
+        if page:
+            self.service.mark_ready(branch, page[0]['Order Number'])
+
+    def pickup_page(self):
+        self.service.queue_count(READY)
+        page = self.service.queue_page(READY, 0, PAGE_SIZE)
+        if page:
+            self.service.pickup(page[0]['Branch'], page[0]['Order Number'])
+
+    def report(self):
+        branch = self.rng.choice(FIXED_BRANCHES)
+        now = datetime.now()
+        start = {
+            'daily': now, 'weekly': now - timedelta(days=6), 'monthly': now.replace(day=1)
+        }[self.rng.choice(['daily', 'weekly', 'monthly'])]
+        with self.service.pool.connection() as conn:
+            buckets = load_rollups(conn, branch, start.strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d'))
+        buckets = buckets[buckets['Revenue'] > 0]
+        if not buckets.empty:
+            buckets.groupby('Coffee Type')['Quantity'].sum()
+            restock_cost(usage_table.totals(buckets), restock_prices)
+
+
+def summarize(samples):
+    latencies = np.array(samples) * 1e3
+    total = latencies.sum() / 1e3
+    return {
+        'count': len(samples),
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p90_ms': float(np.percentile(latencies, 90)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'max_ms': float(latencies.max()),
+        'throughput_per_s': len(samples) / total if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=10_000, help='historical orders to prefill')
+    parser.add_argument('--ops', type=int, default=5_000, help='operations to run')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'bench.db')
+    pool = ConnectionPool(db_path)
+    with pool.connection() as conn:
+        init_ledger(conn)
+        init_order_numbers(conn)
+
+    setup = {}
+    start = time.perf_counter()
+    prefill(pool, rng, args.orders, datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+    setup['prefill_s'] = time.perf_counter() - start
+    start = time.perf_counter()
+    bench = Bench(CoffeeShopService(db_path, BENCH_STOCK), rng)
+    setup['service_start_s'] = time.perf_counter() - start
+
+    operations = {
+        'order': bench.order,
+        'inventory': bench.inventory_check,
+        'kitchen': bench.kitchen_page,
+        'pickup': bench.pickup_page,
+        'report': bench.report,
+    }
+    names = list(MIX)
+    schedule = rng.choices(names, weights=[MIX[name] for name in names], k=args.ops)
+    samples = {name: [] for name in names}
+
+    wall = time.perf_counter()
+    for name in schedule:
+        start = time.perf_counter()
+        operations[name]()
+        samples[name].append(time.perf_counter() - start)
+    wall = time.perf_counter() - wall
+
+    results = {
+        'benchmark': 'bench_paths',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'prefilled_orders': args.orders,
+        'operations': args.ops,
+        'mix': MIX,
+        'setup': setup,
+        'wall_s': wall,
+        'overall_throughput_per_s': args.ops / wall,
+        'results': {name: summarize(times) for name, times in samples.items() if times},
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Timing harness for Streamlit script startup.
+#
+# Streamlit re-executes the whole app script on every widget interaction, so
+# the module-level work in CoffeeShop.py is paid on every click. This measures
+# the first ("cold") run of the script in a fresh process and the following
+# ("warm") reruns of the same session, using Streamlit's headless AppTest
+# runner. Run from the repository root; pass another script path to compare
+# revisions (e.g. a copy checked out with `git worktree`):
+#
+#     python benchmarks/bench_startup.py [path/to/CoffeeShop.py] [--reruns N]
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('script', nargs='?', default=os.path.join(ROOT, 'CoffeeShop.py'))
+    parser.add_argument('--reruns', type=int, default=20)
+    args = parser.parse_args()
+    script = os.path.abspath(args.script)
+
+    # Run against a throwaway database in a scratch directory
+    os.chdir(tempfile.mkdtemp())
+    sys.path.insert(0, os.path.dirname(script))
+
+    at = AppTest.from_file(script, default_timeout=120)
+    at.session_state['show_about'] = False
+    at.session_state['user'] = 'bench'
+    at.session_state['is_admin'] = False
+
+    start = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - start
+
+    warm = []
+    for _ in range(args.reruns):
+        start = time.perf_counter()
+        at.run()
+        warm.append(time.perf_counter() - start)
+
+    print(f'script:      {script}')
+    print(f'cold start:  {cold * 1e3:.1f} ms')
+    print(f'warm rerun:  median {statistics.median(warm) * 1e3:.1f} ms, '
+          f'min {min(warm) * 1e3:.1f} ms over {args.reruns} reruns')
+    print(f'matplotlib loaded after reruns: {"matplotlib.pyplot" in sys.modules}')
+
+
+if __name__ == '__main__':
+    main()
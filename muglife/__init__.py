@@ -0,0 +1,4 @@
+# Streamlit-independent building blocks for the Mug Life coffee shop app.
+# CoffeeShop.py is the Streamlit entry point and imports from here; modules in
+# this package are imported once per process, so state kept in them survives
+# the script reruns Streamlit performs on every widget interaction.
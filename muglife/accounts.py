@@ -0,0 +1,14 @@
+# Create the customer and admin account tables if they don't exist
+def init_accounts(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS customers (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT UNIQUE,
+                    password TEXT,
+                    favorite_order TEXT
+                )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS admins (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT UNIQUE,
+                    password TEXT
+                )''')
+    conn.commit()
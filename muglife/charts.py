@@ -0,0 +1,70 @@
+import io
+import threading
+from collections import OrderedDict
+
+from muglife.perf import timed
+
+
+# Rasterizes a matplotlib figure to PNG bytes and frees it straight away.
+# Figures are built with the object-oriented Figure API rather than pyplot, so
+# they never enter pyplot's global registry and can't pile up on the server.
+def _render_png(draw):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    try:
+        draw(fig.subplots())
+        buffer = io.BytesIO()
+        # Same output settings st.pyplot uses
+        fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+# Pie chart of cups sold per coffee type
+@timed
+def render_sales_pie(labels, quantities):
+    def draw(ax):
+        ax.pie(quantities, labels=labels, autopct='%1.1f%%', startangle=90)
+        ax.axis('equal')
+    return _render_png(draw)
+
+
+# Bar chart of revenue, inventory cost and profit for a branch
+@timed
+def render_financial_bars(branch, revenue, inventory_cost, profit):
+    def draw(ax):
+        ax.bar(['Total Revenue', 'Inventory Cost', 'Profit'], [revenue, inventory_cost, profit],
+               color=['#66B3FF', '#FF9999', '#99FF99'])
+        ax.set_ylabel('Amount (RM)')
+        ax.set_title(f'Financial Overview ({branch})')
+    return _render_png(draw)
+
+
+# Process-wide LRU cache of rendered chart images.
+# Keys identify the chart and the exact data plotted, so switching pages or
+# rerunning with unchanged sales reuses the PNG instead of re-rasterizing it.
+class ChartCache:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Cached image for key, or render() it and cache the result
+    def get_or_render(self, key, render):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+        # Render outside the lock so other sessions aren't blocked meanwhile
+        image = render()
+        with self._lock:
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+        return image
@@ -0,0 +1,68 @@
+import pandas as pd
+
+from muglife.coupons import CouponUnavailable, redeem_coupon
+from muglife.ledger import write_orders
+from muglife.loyalty import accrue_points, points_earned, redeem_points
+from muglife.order_numbers import pickup_code
+from muglife.perf import timed
+
+
+# Total ingredient and cup needs of a cart per branch, as {branch: {item: amount}}.
+# The whole cart goes through the vectorized usage kernel in one call.
+def cart_needs(cart, usage_table):
+    frame = pd.DataFrame(cart)
+    usage = pd.DataFrame(usage_table.per_order(frame), columns=usage_table.ingredients)
+    usage['cups'] = frame['Quantity'].to_numpy()
+    totals = usage.groupby(frame['Branch'].to_numpy()).sum()
+    return {branch: {item: int(amount) for item, amount in row.items()} for branch, row in totals.iterrows()}
+
+
+# Commit a whole cart (the temp_orders line items) as one unit: validate and
+# reserve the summed stock once, then write every order row, the coupon
+# redemption if one was applied, and the customer's loyalty redemption and
+# accrual in a single ledger transaction. Either every line is placed or none is.
+# Placed orders join their branch's kitchen queue.
+# Returns (orders, None) on success or ([], (branch, item)) when stock runs short;
+# raises CouponUnavailable if the coupon can no longer be redeemed and
+# InsufficientPoints if the points to redeem are no longer available.
+@timed
+def commit_cart(conn, cart, customer_name, order_time, inventory, kitchen, usage_table, order_numbers,
+                coupon_code=None, customer_id=None, points_to_redeem=0, amount_paid=0.0):
+    if not cart:
+        return [], None
+
+    needs_by_branch = cart_needs(cart, usage_table)
+    shortage = inventory.reserve_many(needs_by_branch)
+    if shortage:
+        return [], shortage
+
+    try:
+        # Allocating a number may touch the database too, so it happens inside
+        # the block that hands the reserved stock back on failure
+        orders = [{
+            'Order Number': order_numbers.allocate(conn, item['Branch'], order_time),
+            'Customer Name': customer_name,
+            'Coffee Type': item['Coffee Type'],
+            'Quantity': item['Quantity'],
+            'Size': item['Size'],
+            'Add-ons': item['Add-ons'],
+            'Price': item['Price'],
+            'Time': order_time,
+            'Status': 'Being Processed',
+            'Branch': item['Branch'],
+        } for item in cart]
+
+        with conn:
+            write_orders(conn, orders)
+            if coupon_code and redeem_coupon(conn, coupon_code, customer_name, order_time) is None:
+                raise CouponUnavailable(coupon_code)
+            if customer_id is not None:
+                details = 'Orders ' + ', '.join(pickup_code(order['Branch'], order['Order Number']) for order in orders)
+                redeem_points(conn, customer_id, points_to_redeem, order_time, details)
+                accrue_points(conn, customer_id, points_earned(amount_paid), order_time, details)
+    except Exception:
+        # Nothing was written, so hand the reserved stock back
+        inventory.release(needs_by_branch)
+        raise
+    kitchen.enqueue(orders)
+    return orders, None
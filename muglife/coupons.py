@@ -0,0 +1,94 @@
+import pandas as pd
+
+# Columns of the frames shown on the coupon admin page
+COUPON_COLUMNS = ['Code', 'Discount', 'Expiration Date', 'Redemptions']
+USAGE_COLUMNS = ['Coupon Code', 'Customer Name', 'Discount', 'Time']
+
+
+# Raised inside the checkout transaction when the coupon applied to a cart
+# can no longer be redeemed (e.g. it expired or was pruned after the quote)
+class CouponUnavailable(Exception):
+    pass
+
+
+# Create the coupon registry and its redemption history.
+# Coupons are keyed by code, so a checkout lookup is a single primary-key probe.
+# Expiry is stored as an ISO date with its own index, so expired codes can be
+# dropped with one range delete.
+def init_coupons(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS coupons (
+                    code TEXT PRIMARY KEY,
+                    discount REAL NOT NULL,
+                    expires TEXT NOT NULL,
+                    redemptions INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_coupons_expires ON coupons (expires)')
+    conn.execute('''CREATE TABLE IF NOT EXISTS coupon_usage_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    code TEXT NOT NULL,
+                    customer_name TEXT,
+                    discount REAL NOT NULL,
+                    time TEXT NOT NULL
+                )''')
+    conn.commit()
+
+
+# Create a coupon, or re-issue an existing code with a new discount and expiry
+# while keeping its redemption count
+def add_coupon(conn, code, discount, expires):
+    with conn:
+        conn.execute(
+            '''INSERT INTO coupons (code, discount, expires) VALUES (?, ?, ?)
+               ON CONFLICT (code) DO UPDATE SET discount = excluded.discount, expires = excluded.expires''',
+            (code, float(discount), expires.isoformat())
+        )
+
+
+# Discount of a coupon that is still valid on the given date, or None
+def find_coupon(conn, code, today):
+    row = conn.execute(
+        'SELECT discount FROM coupons WHERE code = ? AND expires >= ?',
+        (code, today.isoformat())
+    ).fetchone()
+    return row[0] if row else None
+
+
+# Count a redemption and record it in the usage history.
+# Runs inside the caller's transaction, so the redemption is written together
+# with the orders it paid for. The count is bumped by a single conditional
+# UPDATE, which is atomic across sessions and re-checks the expiry.
+# Returns the discount redeemed, or None if the coupon is no longer valid.
+def redeem_coupon(conn, code, customer_name, redeemed_at):
+    row = conn.execute(
+        '''UPDATE coupons SET redemptions = redemptions + 1
+           WHERE code = ? AND expires >= ? RETURNING discount''',
+        (code, redeemed_at.date().isoformat())
+    ).fetchone()
+    if row is None:
+        return None
+    conn.execute(
+        'INSERT INTO coupon_usage_history (code, customer_name, discount, time) VALUES (?, ?, ?, ?)',
+        (code, customer_name, row[0], redeemed_at.strftime('%Y-%m-%d %H:%M:%S'))
+    )
+    return row[0]
+
+
+# Delete every coupon that expired before the given date; returns how many went
+def prune_expired_coupons(conn, today):
+    with conn:
+        return conn.execute('DELETE FROM coupons WHERE expires < ?', (today.isoformat(),)).rowcount
+
+
+# Every coupon, expired ones included, soonest expiry first
+def load_coupons(conn):
+    rows = conn.execute('SELECT code, discount, expires, redemptions FROM coupons ORDER BY expires, code').fetchall()
+    return pd.DataFrame(rows, columns=COUPON_COLUMNS)
+
+
+# The most recent redemptions, newest first
+def load_coupon_usage(conn, limit=50):
+    rows = conn.execute(
+        'SELECT code, customer_name, discount, time FROM coupon_usage_history ORDER BY id DESC LIMIT ?',
+        (limit,)
+    ).fetchall()
+    return pd.DataFrame(rows, columns=USAGE_COLUMNS)
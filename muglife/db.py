@@ -0,0 +1,54 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+# Small pool of SQLite connections shared by all Streamlit script threads.
+# Connections are opened lazily up to `size`, configured once for concurrent
+# use (WAL journal so readers never block the writer, NORMAL sync, a larger
+# page cache) and returned to the pool after each use, which also keeps their
+# prepared statement caches warm across reruns and sessions.
+class ConnectionPool:
+    def __init__(self, path, size=8, timeout=30):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, cached_statements=256)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA cache_size=-8192')  # 8 MB page cache per connection
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get(timeout=self.timeout)
+
+    # Borrow a connection for the duration of a with-block
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            # Never hand a half-finished transaction to the next borrower
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
@@ -0,0 +1,174 @@
+import re
+
+import pandas as pd
+
+from muglife.perf import timed
+
+# Per-coffee rating statistics shown to the admin, one row per coffee
+STATS_COLUMNS = ['Coffee', 'Reviews', 'Coffee Rating', 'Service Rating']
+
+_FEEDBACK_KEYS = ('Name', 'Coffee Purchased', 'Coffee Rating', 'Service Rating', 'Additional Feedback', 'Branch', 'Time')
+
+_UPSERT_STATS = '''INSERT INTO feedback_stats (branch, coffee, reviews, coffee_rating_sum, service_rating_sum)
+                   VALUES (?, ?, 1, ?, ?)
+                   ON CONFLICT (branch, coffee) DO UPDATE SET
+                       reviews = reviews + 1,
+                       coffee_rating_sum = coffee_rating_sum + excluded.coffee_rating_sum,
+                       service_rating_sum = service_rating_sum + excluded.service_rating_sum'''
+
+
+# Create the feedback table, its running per-branch, per-coffee statistics and
+# the full-text index over comments, backfilling the statistics and the index
+# the first time they are created on an existing database.
+# Comments are read newest first per branch, which the (branch, time) index serves.
+def init_feedback(conn):
+    fts_exists = conn.execute(
+        "SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'feedback_fts')"
+    ).fetchone()[0]
+    conn.execute('''CREATE TABLE IF NOT EXISTS feedback (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    branch TEXT NOT NULL,
+                    time TEXT NOT NULL,
+                    name TEXT,
+                    coffee TEXT NOT NULL,
+                    coffee_rating INTEGER NOT NULL,
+                    service_rating INTEGER NOT NULL,
+                    comments TEXT
+                )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_feedback_branch_time ON feedback (branch, time)')
+    conn.execute('''CREATE TABLE IF NOT EXISTS feedback_stats (
+                    branch TEXT NOT NULL,
+                    coffee TEXT NOT NULL,
+                    reviews INTEGER NOT NULL,
+                    coffee_rating_sum INTEGER NOT NULL,
+                    service_rating_sum INTEGER NOT NULL,
+                    PRIMARY KEY (branch, coffee)
+                ) WITHOUT ROWID''')
+    empty = conn.execute('SELECT NOT EXISTS (SELECT 1 FROM feedback_stats)').fetchone()[0]
+    if empty:
+        conn.execute('''INSERT INTO feedback_stats (branch, coffee, reviews, coffee_rating_sum, service_rating_sum)
+                        SELECT branch, coffee, COUNT(*), SUM(coffee_rating), SUM(service_rating)
+                        FROM feedback
+                        GROUP BY branch, coffee''')
+    # External-content FTS5 index: it stores only the tokens and reads the
+    # text back from the feedback table by rowid. The branch is indexed too, so
+    # a branch filter intersects posting lists inside the index instead of
+    # looking up every matching comment's row.
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5 (
+                    comments,
+                    branch,
+                    content = 'feedback',
+                    content_rowid = 'id',
+                    tokenize = 'porter unicode61'
+                )''')
+    if not fts_exists:
+        conn.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+# Record one feedback entry (a dict keyed like the feedback form), index its
+# comment and fold its ratings into the running statistics, in a single transaction
+def add_feedback(conn, feedback):
+    with conn:
+        cursor = conn.execute(
+            '''INSERT INTO feedback (branch, time, name, coffee, coffee_rating, service_rating, comments)
+               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (feedback['Branch'], feedback['Time'], feedback['Name'], feedback['Coffee Purchased'],
+             int(feedback['Coffee Rating']), int(feedback['Service Rating']), feedback['Additional Feedback'])
+        )
+        conn.execute('INSERT INTO feedback_fts (rowid, comments, branch) VALUES (?, ?, ?)',
+                     (cursor.lastrowid, feedback['Additional Feedback'] or '', feedback['Branch']))
+        conn.execute(_UPSERT_STATS, (feedback['Branch'], feedback['Coffee Purchased'],
+                                     int(feedback['Coffee Rating']), int(feedback['Service Rating'])))
+
+
+# Average ratings per coffee for a branch, read from the running statistics
+@timed
+def feedback_stats(conn, branch):
+    rows = conn.execute(
+        '''SELECT coffee, reviews, 1.0 * coffee_rating_sum / reviews, 1.0 * service_rating_sum / reviews
+           FROM feedback_stats WHERE branch = ? ORDER BY coffee''',
+        (branch,)
+    ).fetchall()
+    return pd.DataFrame(rows, columns=STATS_COLUMNS)
+
+
+# Branch-wide (reviews, average coffee rating, average service rating);
+# the averages are None when the branch has no feedback yet
+def feedback_totals(conn, branch):
+    reviews, coffee_sum, service_sum = conn.execute(
+        '''SELECT COALESCE(SUM(reviews), 0), SUM(coffee_rating_sum), SUM(service_rating_sum)
+           FROM feedback_stats WHERE branch = ?''',
+        (branch,)
+    ).fetchone()
+    if not reviews:
+        return 0, None, None
+    return reviews, coffee_sum / reviews, service_sum / reviews
+
+
+# One page of a branch's feedback, newest first, as dicts keyed like the feedback form
+@timed
+def load_feedback_page(conn, branch, offset, limit):
+    rows = conn.execute(
+        '''SELECT name, coffee, coffee_rating, service_rating, comments, branch, time
+           FROM feedback WHERE branch = ?
+           ORDER BY time DESC, id DESC LIMIT ? OFFSET ?''',
+        (branch, limit, offset)
+    ).fetchall()
+    return [dict(zip(_FEEDBACK_KEYS, row)) for row in rows]
+
+
+# Turn free text into an FTS5 query on the comments of one branch: every word
+# must appear, as a prefix, so 'slow' also finds 'slowly'. Words are quoted,
+# so user input can never be parsed as FTS5 syntax. Returns None when there is
+# nothing to search for.
+def _match_query(text, branch):
+    words = ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+    if not words:
+        return None
+    return f'comments : ({words}) AND branch : "{branch}"'
+
+
+# FROM/WHERE clause and parameters of a comment search on one branch,
+# optionally restricted to one coffee and to (low, high) coffee and service
+# rating ranges; None when the text holds no words.
+# The FTS table drives the join, so only comments that match the text are
+# looked up in the feedback table.
+def _search_filter(branch, text, coffee, coffee_ratings, service_ratings):
+    match = _match_query(text, branch)
+    if match is None:
+        return None
+    clauses = ['feedback_fts MATCH ?', 'f.branch = ?',
+               'f.coffee_rating BETWEEN ? AND ?', 'f.service_rating BETWEEN ? AND ?']
+    params = [match, branch, *coffee_ratings, *service_ratings]
+    if coffee is not None:
+        clauses.append('f.coffee = ?')
+        params.append(coffee)
+    joined = f"FROM feedback_fts CROSS JOIN feedback f ON f.id = feedback_fts.rowid WHERE {' AND '.join(clauses)}"
+    return joined, params
+
+
+# Number of comments matching a search
+@timed
+def count_feedback_matches(conn, branch, text, coffee=None, coffee_ratings=(1, 5), service_ratings=(1, 5)):
+    search = _search_filter(branch, text, coffee, coffee_ratings, service_ratings)
+    if search is None:
+        return 0
+    joined, params = search
+    return conn.execute(f'SELECT COUNT(*) {joined}', params).fetchone()[0]
+
+
+# One page of the comments matching a search, best bm25 match first, as dicts
+# keyed like the feedback form. The branch column is given no weight in the ranking.
+@timed
+def search_feedback(conn, branch, text, offset, limit, coffee=None, coffee_ratings=(1, 5), service_ratings=(1, 5)):
+    search = _search_filter(branch, text, coffee, coffee_ratings, service_ratings)
+    if search is None:
+        return []
+    joined, params = search
+    rows = conn.execute(
+        f'''SELECT f.name, f.coffee, f.coffee_rating, f.service_rating, f.comments, f.branch, f.time
+            {joined} ORDER BY bm25(feedback_fts, 1.0, 0.0), f.id DESC LIMIT ? OFFSET ?''',
+        params + [limit, offset]
+    ).fetchall()
+    return [dict(zip(_FEEDBACK_KEYS, row)) for row in rows]
@@ -0,0 +1,116 @@
+import math
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Consumption from this long ago (in seconds) counts half as much as consumption now
+DEFAULT_HALF_LIFE = 3600
+
+# Order times are naive local datetimes, so they are turned into seconds
+# against a naive epoch, the same way pandas stores them
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _seconds(moment):
+    return (moment - _EPOCH).total_seconds()
+
+
+# Per-branch consumption rates as exponentially weighted moving averages.
+# Each branch keeps, per item, the exponentially decayed sum of what its
+# orders used; for a steady stream of orders that sum is rate * tau, so a rate
+# is one multiply at read time and recording an order is one decay and add per
+# item. Cups are tracked like any ingredient, so usage per cup of the recent
+# sales mix is simply the ratio of an ingredient's sum to the cups sum.
+class ConsumptionForecaster:
+    def __init__(self, branches, items, default_per_cup, half_life=DEFAULT_HALF_LIFE):
+        self.items = list(items)
+        # Usage per cup assumed until a branch has sold anything
+        self.default_per_cup = dict(default_per_cup)
+        self.tau = half_life / math.log(2)
+        self._sums = {branch: dict.fromkeys(self.items, 0.0) for branch in branches}
+        self._updated = dict.fromkeys(branches, None)
+        self._locks = {branch: threading.Lock() for branch in branches}
+
+    # Start of the history worth loading: orders older than a dozen
+    # half-lives would contribute almost nothing
+    def history_since(self, now):
+        return (now - timedelta(seconds=12 * self.tau * math.log(2))).replace(microsecond=0)
+
+    # Seed the averages from past orders (a time-sorted order frame) so
+    # forecasts are meaningful straight after a restart. Orders before
+    # history_since are skipped by a binary search.
+    def load_history(self, frame, usage_table, now):
+        frame = frame.iloc[frame['Time'].searchsorted(pd.Timestamp(self.history_since(now))):]
+        if frame.empty:
+            return
+        now = _seconds(now)
+        order_seconds = frame['Time'].to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+        weights = np.exp(-np.maximum(0.0, now - order_seconds) / self.tau)
+        usage = usage_table.per_order(frame) * weights[:, None]
+        cups = frame['Quantity'].to_numpy(dtype=float) * weights
+        branches = frame['Branch'].to_numpy()
+        for branch in self._sums:
+            in_branch = branches == branch
+            if not in_branch.any():
+                continue
+            sums = dict(zip(usage_table.ingredients, usage[in_branch].sum(axis=0).tolist()))
+            sums['cups'] = float(cups[in_branch].sum())
+            with self._locks[branch]:
+                self._sums[branch] = {item: sums.get(item, 0.0) for item in self.items}
+                self._updated[branch] = now
+
+    # Add one order's needs ({item: amount}) placed at `when`
+    def record(self, branch, needs, when):
+        when = _seconds(when)
+        with self._locks[branch]:
+            sums = self._sums[branch]
+            updated = self._updated[branch]
+            if updated is None or when >= updated:
+                decay = math.exp(-(when - updated) / self.tau) if updated is not None else 0.0
+                for item in self.items:
+                    sums[item] = sums[item] * decay + needs.get(item, 0)
+                self._updated[branch] = when
+            else:
+                # A concurrent commit already moved the clock on; age this one instead
+                weight = math.exp(-(updated - when) / self.tau)
+                for item in self.items:
+                    sums[item] += needs.get(item, 0) * weight
+
+    # Current consumption per hour of every item at a branch
+    def rates(self, branch, now):
+        now = _seconds(now)
+        with self._locks[branch]:
+            updated = self._updated[branch]
+            if updated is None:
+                return dict.fromkeys(self.items, 0.0)
+            scale = math.exp(-max(0.0, now - updated) / self.tau) / self.tau * 3600
+            return {item: amount * scale for item, amount in self._sums[branch].items()}
+
+    # Usage per cup of the branch's recent sales mix, including add-ons
+    def per_cup(self, branch):
+        with self._locks[branch]:
+            sums = dict(self._sums[branch])
+        if sums['cups'] <= 0:
+            return dict(self.default_per_cup)
+        return {item: sums[item] / sums['cups'] for item in self.items if item != 'cups'}
+
+    # Forecast for a branch's stock ({item: level}): per item the current use
+    # per hour and the hours until it runs out at that pace (None while it is
+    # not being used), plus the cups the stock still makes at the recent mix.
+    # Constant time in the number of orders.
+    def forecast(self, branch, stock, now):
+        rates = self.rates(branch, now)
+        items = {
+            item: {
+                'per_hour': rates[item],
+                'hours_left': max(0.0, stock[item]) / rates[item] if rates[item] > 0 else None,
+            }
+            for item in self.items
+        }
+        cups_remaining = stock['cups']
+        for item, amount in self.per_cup(branch).items():
+            if amount > 0:
+                cups_remaining = min(cups_remaining, stock[item] / amount)
+        return {'items': items, 'cups_remaining': max(0, int(cups_remaining))}
@@ -0,0 +1,60 @@
+import threading
+
+
+# Process-wide stock levels for every branch.
+# Each branch has its own lock, so orders at different branches never wait on
+# each other, and reserve_many() checks and deducts a whole cart's needs under
+# those locks, closing the check-then-act race between concurrent sessions.
+class InventoryEngine:
+    def __init__(self, branches, initial_stock):
+        self._stock = {branch: dict(initial_stock) for branch in branches}
+        self._locks = {branch: threading.Lock() for branch in branches}
+
+    # Copy of a branch's current stock levels
+    def snapshot(self, branch):
+        with self._locks[branch]:
+            return dict(self._stock[branch])
+
+    # First item whose stock can't cover the needs ({item: amount}), or None
+    @staticmethod
+    def _shortage(stock, needs):
+        for item, amount in needs.items():
+            if stock[item] < amount:
+                return item
+        return None
+
+    # Reserve needs at several branches as one all-or-nothing step.
+    # needs_by_branch maps branch -> {item: amount}. Locks are taken in sorted
+    # branch order so concurrent carts can't deadlock. Returns (branch, item)
+    # for the first shortage, leaving all stock untouched, or None on success.
+    def reserve_many(self, needs_by_branch):
+        branches = sorted(needs_by_branch)
+        for branch in branches:
+            self._locks[branch].acquire()
+        try:
+            for branch in branches:
+                short_item = self._shortage(self._stock[branch], needs_by_branch[branch])
+                if short_item is not None:
+                    return branch, short_item
+            for branch in branches:
+                stock = self._stock[branch]
+                for item, amount in needs_by_branch[branch].items():
+                    stock[item] -= amount
+            return None
+        finally:
+            for branch in reversed(branches):
+                self._locks[branch].release()
+
+    # Give back stock taken by reserve_many, e.g. when the order write fails
+    def release(self, needs_by_branch):
+        for branch, needs in needs_by_branch.items():
+            with self._locks[branch]:
+                stock = self._stock[branch]
+                for item, amount in needs.items():
+                    stock[item] += amount
+
+    # Add stock for an item and return the new level
+    def restock(self, branch, item, amount):
+        with self._locks[branch]:
+            self._stock[branch][item] += amount
+            return self._stock[branch][item]
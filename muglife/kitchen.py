@@ -0,0 +1,147 @@
+import threading
+from itertools import islice
+
+from muglife.order_numbers import pickup_code
+
+PROCESSING = 'Being Processed'
+READY = 'Ready'
+PICKED_UP = 'Picked Up'
+
+# Preparation time in seconds per drink size, plus a fixed time per add-on
+PREP_SECONDS = {'small': 120, 'medium': 180, 'large': 300}
+ADD_ON_PREP_SECONDS = 30
+
+
+# Preparation time of one line item; add_ons is a list or the stored
+# comma-separated string ('None' when there are no add-ons)
+def prep_time(size, add_ons):
+    if isinstance(add_ons, str):
+        add_ons = [] if add_ons in ('', 'None') else add_ons.split(', ')
+    return PREP_SECONDS[size] + len(add_ons) * ADD_ON_PREP_SECONDS
+
+
+# Active orders of one branch, split by status.
+# Each status is an insertion-ordered dict keyed by order number, which gives
+# FIFO iteration like a deque while still allowing O(1) removal of the order
+# that was just marked ready or picked up, wherever it sits in the line.
+# outstanding_seconds is the running total of prep time still ahead of the
+# kitchen, kept up to date on enqueue and mark-ready so an ETA is O(1).
+class KitchenQueue:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queues = {PROCESSING: {}, READY: {}}
+        self.outstanding_seconds = 0
+
+
+# Per-branch kitchen queues shared by every session of the process.
+# Enqueue, mark-ready and pickup are constant time and listing a queue costs
+# the number of orders in it, independent of the size of the order history.
+class KitchenBoard:
+    def __init__(self, branches):
+        self._branches = {branch: KitchenQueue() for branch in branches}
+
+    # Build the board from the orders that are still active in the ledger
+    @classmethod
+    def from_orders(cls, branches, frame):
+        board = cls(branches)
+        frame = frame[frame['Branch'].isin(branches)]
+        for status in (PROCESSING, READY):
+            for order in frame[frame['Status'] == status].to_dict('records'):
+                board._add(order, status)
+        return board
+
+    def _add(self, order, status):
+        queue = self._branches[order['Branch']]
+        entry = dict(order, Status=status)
+        entry['Prep Time'] = prep_time(entry['Size'], entry['Add-ons'])
+        entry['Pickup Code'] = pickup_code(entry['Branch'], entry['Order Number'])
+        with queue.lock:
+            queue.queues[status][int(order['Order Number'])] = entry
+            if status == PROCESSING:
+                queue.outstanding_seconds += entry['Prep Time']
+
+    # Add freshly committed orders to the back of their branch's queue
+    def enqueue(self, orders):
+        for order in orders:
+            self._add(order, PROCESSING)
+
+    # Move an order between statuses; returns the order, or None if it was not
+    # in the expected queue (e.g. another session already moved it)
+    def _move(self, branch, order_number, current_status, new_status):
+        queue = self._branches[branch]
+        with queue.lock:
+            order = queue.queues[current_status].pop(int(order_number), None)
+            if order is None:
+                return None
+            if current_status == PROCESSING:
+                queue.outstanding_seconds -= order['Prep Time']
+            order['Status'] = new_status
+            if new_status in queue.queues:
+                queue.queues[new_status][int(order_number)] = order
+            return order
+
+    def mark_ready(self, branch, order_number):
+        return self._move(branch, order_number, PROCESSING, READY)
+
+    def pickup(self, branch, order_number):
+        return self._move(branch, order_number, READY, PICKED_UP)
+
+    # An active order (still being processed or ready), or None
+    def find(self, branch, order_number):
+        queue = self._branches[branch]
+        with queue.lock:
+            for orders in queue.queues.values():
+                order = orders.get(int(order_number))
+                if order is not None:
+                    return dict(order)
+        return None
+
+    # Seconds of preparation still queued ahead at a branch
+    def outstanding_seconds(self, branch):
+        return self._branches[branch].outstanding_seconds
+
+    # Orders in a branch's queue for a status, oldest first
+    def active(self, branch, status):
+        queue = self._branches[branch]
+        with queue.lock:
+            return list(queue.queues[status].values())
+
+    # Orders in a status across all branches, oldest first per branch
+    def active_all(self, status):
+        return [order for branch in self._branches for order in self.active(branch, status)]
+
+    # The order at the head of a branch's queue for a status, or None
+    def oldest(self, branch, status):
+        queue = self._branches[branch]
+        with queue.lock:
+            return next(iter(queue.queues[status].values()), None)
+
+    # Number of orders in a branch's queue for a status
+    def count(self, branch, status):
+        return len(self._branches[branch].queues[status])
+
+    def count_all(self, status):
+        return sum(self.count(branch, status) for branch in self._branches)
+
+    # One page of a branch's queue, oldest first. Only the page itself is
+    # copied; orders ahead of it are stepped over, and screens mostly look at
+    # the front of the line, so a page costs about its own size.
+    def page(self, branch, status, offset, limit):
+        queue = self._branches[branch]
+        with queue.lock:
+            return list(islice(queue.queues[status].values(), offset, offset + limit))
+
+    # One page of a status across all branches, in the order of active_all.
+    # Branches that lie entirely before the page are skipped by their counts.
+    def page_all(self, status, offset, limit):
+        page = []
+        for branch in self._branches:
+            if len(page) >= limit:
+                break
+            count = self.count(branch, status)
+            if offset >= count:
+                offset -= count
+                continue
+            page.extend(self.page(branch, status, offset, limit - len(page)))
+            offset = 0
+        return page
@@ -0,0 +1,164 @@
+import pandas as pd
+
+from muglife.rollups import add_to_rollups, init_rollups
+
+# Columns of the order frame used throughout the app, in display order
+ORDER_COLUMNS = [
+    'Order Number', 'Customer Name', 'Coffee Type', 'Quantity',
+    'Size', 'Add-ons', 'Price', 'Time', 'Status', 'Branch'
+]
+
+# Timestamps are stored as sortable ISO text in SQLite and as datetime64 in frames
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Mapping from the frame column names to the columns of the orders table
+_SQL_COLUMNS = {
+    'Order Number': 'order_number',
+    'Customer Name': 'customer_name',
+    'Coffee Type': 'coffee_type',
+    'Quantity': 'quantity',
+    'Size': 'size',
+    'Add-ons': 'add_ons',
+    'Price': 'price',
+    'Time': 'time',
+    'Status': 'status',
+    'Branch': 'branch',
+}
+
+_SELECT_COLUMNS = ', '.join(_SQL_COLUMNS.values())
+
+# Statuses of orders still in the kitchen or waiting at the counter. The
+# partial index below only covers these rows, and queries must spell the
+# statuses out literally for SQLite to use it.
+_ACTIVE_STATUSES = "('Being Processed', 'Ready')"
+
+
+# Create the orders table and its indexes if they don't exist.
+# Order rows are never deleted; an order's lifecycle is tracked by updating its
+# status column in place ('Being Processed' -> 'Ready' -> 'Picked Up', see
+# set_order_status), so history is never lost.
+def init_ledger(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS orders (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    order_number INTEGER NOT NULL,
+                    customer_name TEXT,
+                    coffee_type TEXT NOT NULL,
+                    quantity INTEGER NOT NULL,
+                    size TEXT NOT NULL,
+                    add_ons TEXT,
+                    price REAL NOT NULL,
+                    time TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    branch TEXT NOT NULL
+                )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_orders_branch_time ON orders (branch, time)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_orders_branch_status ON orders (branch, status)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_orders_branch_number ON orders (branch, order_number)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_orders_time ON orders (time)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_orders_active ON orders (time) WHERE status IN {_ACTIVE_STATUSES}')
+    conn.commit()
+    init_rollups(conn)
+
+
+# Append one or more order rows (dicts keyed by ORDER_COLUMNS) and fold them into
+# the sales rollup, all in a single transaction
+def append_orders(conn, orders):
+    with conn:
+        write_orders(conn, orders)
+
+
+# Write order rows and their rollup buckets inside the caller's transaction,
+# for callers that record other changes atomically with the orders
+def write_orders(conn, orders):
+    placeholders = ', '.join('?' for _ in _SQL_COLUMNS)
+    conn.executemany(
+        f"INSERT INTO orders ({', '.join(_SQL_COLUMNS.values())}) VALUES ({placeholders})",
+        [_to_row(order) for order in orders]
+    )
+    add_to_rollups(conn, orders)
+
+
+# Convert an order dict into a tuple for the orders table
+def _to_row(order):
+    row = dict(order)
+    row['Time'] = pd.Timestamp(row['Time']).strftime(TIME_FORMAT)
+    return tuple(row[col] for col in _SQL_COLUMNS)
+
+
+def _frame(rows):
+    frame = pd.DataFrame(rows, columns=ORDER_COLUMNS)
+    frame['Time'] = pd.to_datetime(frame['Time'], format=TIME_FORMAT)
+    return frame
+
+
+def _where(branch=None, status=None, since=None, until=None):
+    clauses, params = [], []
+    if branch is not None:
+        clauses.append('branch = ?')
+        params.append(branch)
+    if status is not None:
+        clauses.append('status = ?')
+        params.append(status)
+    if since is not None:
+        clauses.append('time >= ?')
+        params.append(pd.Timestamp(since).strftime(TIME_FORMAT))
+    if until is not None:
+        clauses.append('time < ?')
+        params.append(pd.Timestamp(until).strftime(TIME_FORMAT))
+    return (f"WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+
+# Load orders as a DataFrame in time order, optionally restricted to a branch,
+# a status and a time range (since inclusive, until exclusive), and paged with
+# offset/limit. Branch and time filters are served by the (branch, time) and
+# (time) indexes, which also deliver the rows already sorted.
+def load_orders(conn, branch=None, status=None, since=None, until=None, offset=0, limit=None):
+    where, params = _where(branch, status, since, until)
+    page = ''
+    if limit is not None:
+        page = 'LIMIT ? OFFSET ?'
+        params += [int(limit), int(offset)]
+    rows = conn.execute(f'SELECT {_SELECT_COLUMNS} FROM orders {where} ORDER BY time, id {page}', params).fetchall()
+    return _frame(rows)
+
+
+# Number of orders matching the same filters as load_orders
+def count_orders(conn, branch=None, status=None, since=None, until=None):
+    where, params = _where(branch, status, since, until)
+    return conn.execute(f'SELECT COUNT(*) FROM orders {where}', params).fetchone()[0]
+
+
+# Time of a branch's first order, or None if it has none
+def first_order_time(conn, branch):
+    row = conn.execute('SELECT MIN(time) FROM orders WHERE branch = ?', (branch,)).fetchone()
+    return pd.Timestamp(row[0]) if row[0] else None
+
+
+# Orders still being processed or waiting for pickup, in time order, read
+# through the partial index over active orders only
+def load_active_orders(conn):
+    rows = conn.execute(
+        f'SELECT {_SELECT_COLUMNS} FROM orders WHERE status IN {_ACTIVE_STATUSES} ORDER BY time, id'
+    ).fetchall()
+    return _frame(rows)
+
+
+# Latest status of an order at a branch, or None if there is no such order
+def find_order_status(conn, branch, order_number):
+    row = conn.execute(
+        'SELECT status FROM orders WHERE branch = ? AND order_number = ? ORDER BY id DESC LIMIT 1',
+        (branch, int(order_number))
+    ).fetchone()
+    return row[0] if row else None
+
+
+# Move an order at a branch from its current status to a new one.
+# Matching on the current status keeps older orders that reused the same
+# pickup number untouched. Returns False if no order was in the current status.
+def set_order_status(conn, branch, order_number, current_status, new_status):
+    with conn:
+        return conn.execute(
+            'UPDATE orders SET status = ? WHERE branch = ? AND order_number = ? AND status = ?',
+            (new_status, branch, int(order_number), current_status)
+        ).rowcount > 0
+
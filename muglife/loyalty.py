@@ -0,0 +1,104 @@
+import pandas as pd
+
+from muglife.perf import timed
+
+# Customers earn one point per full RM10 paid and redeem points at RM0.50 each
+RINGGIT_PER_POINT_EARNED = 10
+POINT_VALUE = 0.50
+
+EARNED = 'Earned'
+REDEEMED = 'Redeemed'
+
+# Columns of the history frames shown to the customer
+HISTORY_COLUMNS = ['Time', 'Points', 'Details']
+
+
+# Raised inside the checkout transaction when a customer tries to redeem more
+# points than their balance holds (e.g. spent from another session meanwhile)
+class InsufficientPoints(Exception):
+    pass
+
+
+# Create the loyalty ledger and the per-customer balances, keyed by customers.id.
+# Every accrual and redemption is a ledger row; the balance column is kept in
+# step with it in the same transaction, so reading a balance is one key lookup.
+def init_loyalty(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS loyalty_accounts (
+                    customer_id INTEGER PRIMARY KEY REFERENCES customers (id),
+                    balance INTEGER NOT NULL DEFAULT 0
+                )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS loyalty_ledger (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    customer_id INTEGER NOT NULL REFERENCES customers (id),
+                    kind TEXT NOT NULL,
+                    points INTEGER NOT NULL,
+                    time TEXT NOT NULL,
+                    details TEXT
+                )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_loyalty_customer_kind ON loyalty_ledger (customer_id, kind, id)')
+    conn.commit()
+
+
+# Points earned for an amount paid
+def points_earned(amount_paid):
+    return int(amount_paid // RINGGIT_PER_POINT_EARNED)
+
+
+def _record(conn, customer_id, kind, points, when, details):
+    conn.execute(
+        'INSERT INTO loyalty_ledger (customer_id, kind, points, time, details) VALUES (?, ?, ?, ?, ?)',
+        (customer_id, kind, points, when.strftime('%Y-%m-%d %H:%M:%S'), details)
+    )
+
+
+# Credit points to a customer; runs inside the caller's transaction
+def accrue_points(conn, customer_id, points, when, details):
+    if points <= 0:
+        return
+    conn.execute(
+        '''INSERT INTO loyalty_accounts (customer_id, balance) VALUES (?, ?)
+           ON CONFLICT (customer_id) DO UPDATE SET balance = balance + excluded.balance''',
+        (customer_id, points)
+    )
+    _record(conn, customer_id, EARNED, points, when, details)
+
+
+# Spend points; runs inside the caller's transaction.
+# The balance is checked and reduced by one conditional UPDATE, so two sessions
+# can never spend the same points.
+def redeem_points(conn, customer_id, points, when, details):
+    if points <= 0:
+        return
+    row = conn.execute(
+        'UPDATE loyalty_accounts SET balance = balance - ? WHERE customer_id = ? AND balance >= ? RETURNING balance',
+        (points, customer_id, points)
+    ).fetchone()
+    if row is None:
+        raise InsufficientPoints(points)
+    _record(conn, customer_id, REDEEMED, points, when, details)
+
+
+# Current point balance of a customer
+def loyalty_balance(conn, customer_id):
+    row = conn.execute('SELECT balance FROM loyalty_accounts WHERE customer_id = ?', (customer_id,)).fetchone()
+    return row[0] if row else 0
+
+
+# Number of ledger entries of one kind for a customer
+def count_loyalty_history(conn, customer_id, kind):
+    return conn.execute(
+        'SELECT COUNT(*) FROM loyalty_ledger WHERE customer_id = ? AND kind = ?',
+        (customer_id, kind)
+    ).fetchone()[0]
+
+
+# One page of a customer's ledger entries of one kind, newest first
+@timed
+def load_loyalty_history(conn, customer_id, kind, offset, limit):
+    rows = conn.execute(
+        '''SELECT time, points, details FROM loyalty_ledger
+           WHERE customer_id = ? AND kind = ?
+           ORDER BY id DESC LIMIT ? OFFSET ?''',
+        (customer_id, kind, limit, offset)
+    ).fetchall()
+    return pd.DataFrame(rows, columns=HISTORY_COLUMNS)
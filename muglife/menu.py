@@ -0,0 +1,78 @@
+# Menu, recipe and price tables for the shop. They live in a module rather than
+# in CoffeeShop.py so they are built once per process instead of on every
+# Streamlit rerun.
+
+from muglife.pricing import PricingEngine
+from muglife.usage import UsageTable
+
+# Fixed branches for the business
+FIXED_BRANCHES = ["KLCC", "TRX", "Seri Iskandar"]
+
+# Coffee Menu Prices
+coffee_menu = {
+    'Americano': {'small': 3.75, 'medium': 5.00, 'large': 7.50},
+    'Cappuccino': {'small': 5.00, 'medium': 6.50, 'large': 8.00},
+    'Latte': {'small': 5.25, 'medium': 6.75, 'large': 8.25},
+    'Caramel Macchiato': {'small': 4.50, 'medium': 7.00, 'large': 9.50}
+}
+
+# Prices for add-ons
+add_on_prices = {
+    'Extra sugar': 0.70,  # Extra 5g of sugar
+    'Extra milk': 0.90,   # Extra 30ml of milk
+}
+
+# Ingredient usage per coffee type and size
+ingredient_usage = {
+    'Americano': {
+        'small': {'coffee_beans': 9, 'milk': 10, 'sugar': 5},
+        'medium': {'coffee_beans': 12, 'milk': 10, 'sugar': 5},
+        'large': {'coffee_beans': 15, 'milk': 10, 'sugar': 5}
+    },
+    'Cappuccino': {
+        'small': {'coffee_beans': 9, 'milk': 60, 'sugar': 5},
+        'medium': {'coffee_beans': 12, 'milk': 80, 'sugar': 5},
+        'large': {'coffee_beans': 15, 'milk': 100, 'sugar': 5}
+    },
+    'Latte': {
+        'small': {'coffee_beans': 9, 'milk': 100, 'sugar': 5},
+        'medium': {'coffee_beans': 12, 'milk': 150, 'sugar': 5},
+        'large': {'coffee_beans': 15, 'milk': 200, 'sugar': 5}
+    },
+    'Caramel Macchiato': {
+        'small': {'coffee_beans': 9, 'milk': 90, 'sugar': 5},
+        'medium': {'coffee_beans': 12, 'milk': 130, 'sugar': 5},
+        'large': {'coffee_beans': 15, 'milk': 180, 'sugar': 5}
+    }
+}
+
+# Daily special offers by weekday; 'coffee' is None when the offer covers every coffee
+daily_offers = {
+    "Monday": {"offer": "20% off on all Americano!", "coffee": "Americano", "discount": 0.20},
+    "Tuesday": {"offer": "30% off on all Cappuccino!", "coffee": "Cappuccino", "discount": 0.30},
+    "Wednesday": {"offer": "40% off on all Latte!", "coffee": "Latte", "discount": 0.40},
+    "Thursday": {"offer": "50% off on all Caramel Macchiato!", "coffee": "Caramel Macchiato", "discount": 0.50},
+    "Friday": {"offer": "15% off on all coffees!", "coffee": None, "discount": 0.15},
+    "Saturday": {"offer": "15% off on all coffees!", "coffee": None, "discount": 0.15},
+    "Sunday": {"offer": "15% off on all coffees!", "coffee": None, "discount": 0.15},
+}
+
+# Extra usage for additional sugar and milk
+extra_usage = {
+    'milk': 30,   # Extra 30ml of milk for "Extra milk"
+    'sugar': 5    # Extra 5g of sugar for "Extra sugar"
+}
+
+# Prices for restock items
+restock_prices = {
+    'coffee_beans': 1.20,  # RM per 100g
+    'milk': 0.70,          # RM per 100ml
+    'sugar': 0.20,         # RM per 100g
+    'cups': 0.02           # RM per cup
+}
+
+# Ingredient usage compiled into an array for vectorized usage and cost calculations
+usage_table = UsageTable(ingredient_usage, extra_usage)
+
+# Menu, add-on and daily offer prices compiled into lookup tables for pricing carts
+pricing_engine = PricingEngine(coffee_menu, add_on_prices, daily_offers)
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds in seconds of the commit latency histogram buckets
+COMMIT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Metric types in the Prometheus text exposition format.
+# Updates are plain dict writes with no lock, so the order and kitchen paths
+# never wait on monitoring. Under heavy contention two threads can race on
+# the same series and lose an increment, which monitoring tolerates; the
+# series dicts are only iterated when the metrics are rendered.
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in sorted(list(self._series.items()), key=lambda item: item[0]):
+            lines.extend(self._render_series(labels, value))
+        return lines
+
+    def _render_series(self, labels, value):
+        return [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        # An unlabelled counter is exported as 0 before its first increment
+        if not self.labelnames:
+            self._series[()] = 0
+
+    def inc(self, *labels, amount=1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, *labels, value):
+        self._series[labels] = value
+
+    def remove(self, *labels):
+        self._series.pop(labels, None)
+
+
+# Fixed-bucket histogram; an observation is one binary search and three adds
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        if not self.labelnames:
+            self._series[()] = self._empty_series()
+
+    def _empty_series(self):
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, self._empty_series())
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def _render_series(self, labels, series):
+        counts, total, count = series
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", _number(bound))])} {cumulative}')
+        lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+        lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+# The shop's production metrics. CoffeeShopService updates them in place at
+# its mutation points (order commit, mark ready, pickup, stock changes) from
+# values it already has at hand, so nothing is scanned to export them.
+class ShopMetrics:
+    def __init__(self):
+        self.orders_committed = Counter(
+            'muglife_orders_committed_total', 'Order lines committed.', ['branch'])
+        self.carts_rejected = Counter(
+            'muglife_carts_rejected_total', 'Carts rejected because a branch was out of stock.', ['branch', 'item'])
+        self.commit_latency = Histogram(
+            'muglife_commit_latency_seconds', 'Time to reserve stock and commit a cart.', COMMIT_LATENCY_BUCKETS)
+        self.queue_depth = Gauge(
+            'muglife_kitchen_queue_depth', 'Active orders per kitchen queue.', ['branch', 'status'])
+        # Queue age is time() minus this; absent while the queue is empty
+        self.queue_oldest = Gauge(
+            'muglife_kitchen_queue_oldest_order_timestamp_seconds',
+            'Order time of the oldest order in a kitchen queue, in Unix seconds.', ['branch', 'status'])
+        self.stock_level = Gauge(
+            'muglife_stock_level', 'Current stock per branch and item (g, ml or cups).', ['branch', 'item'])
+        self.coupon_redemptions = Counter(
+            'muglife_coupon_redemptions_total', 'Coupons redeemed with an order.')
+        self.loyalty_redemptions = Counter(
+            'muglife_loyalty_redemptions_total', 'Orders that redeemed loyalty points.')
+        self.loyalty_points_redeemed = Counter(
+            'muglife_loyalty_points_redeemed_total', 'Loyalty points redeemed.')
+        self._metrics = [
+            self.orders_committed, self.carts_rejected, self.commit_latency, self.queue_depth,
+            self.queue_oldest, self.stock_level, self.coupon_redemptions, self.loyalty_redemptions,
+            self.loyalty_points_redeemed,
+        ]
+
+    # Record one committed cart
+    def cart_committed(self, orders, seconds, coupon_code, points_redeemed):
+        self.commit_latency.observe(seconds)
+        for order in orders:
+            self.orders_committed.inc(order['Branch'])
+        if coupon_code:
+            self.coupon_redemptions.inc()
+        if points_redeemed:
+            self.loyalty_redemptions.inc()
+            self.loyalty_points_redeemed.inc(amount=points_redeemed)
+
+    def cart_rejected(self, branch, item):
+        self.carts_rejected.inc(branch, item)
+
+    # Refresh one kitchen queue's gauges from its length and the order at its head
+    def queue_changed(self, branch, status, depth, oldest):
+        self.queue_depth.set(branch, status, value=depth)
+        if oldest is None:
+            self.queue_oldest.remove(branch, status)
+        else:
+            self.queue_oldest.set(branch, status, value=oldest['Time'].timestamp())
+
+    def stock_changed(self, branch, stock):
+        for item, level in stock.items():
+            self.stock_level.set(branch, item, value=level)
+
+    # Every metric in the Prometheus text exposition format
+    def render(self):
+        return '\n'.join(line for metric in self._metrics for line in metric.render()) + '\n'
+
+    # Write the metrics for a node_exporter textfile collector. The file is
+    # replaced atomically so the collector never reads a partial file.
+    def write_textfile(self, path):
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+
+# Rewrite the metrics file every `interval` seconds from a daemon thread
+def export_textfile_in_thread(metrics, path, interval=15):
+    def run():
+        while True:
+            metrics.write_textfile(path)
+            time.sleep(interval)
+    thread = threading.Thread(target=run, daemon=True, name='muglife-metrics')
+    thread.start()
+    return thread
+
@@ -0,0 +1,100 @@
+import cProfile
+import functools
+import io
+import pstats
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+PAGE = 'page'
+FUNCTION = 'function'
+
+SUMMARY_COLUMNS = ['Kind', 'Name', 'Calls', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Max (ms)']
+
+
+# Per-process timing samples, one fixed-size ring buffer per (kind, name).
+# Recording is two perf_counter calls and a deque append, which is atomic under
+# the GIL, so the hooks take no lock and cost well under a microsecond; the
+# oldest samples fall off once a buffer is full. Percentiles are only computed
+# when the Performance page asks for them.
+class TimingRecorder:
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._samples = {}
+
+    def _buffer(self, kind, name):
+        key = (kind, name)
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples.setdefault(key, deque(maxlen=self.capacity))
+        return samples
+
+    def record(self, kind, name, seconds):
+        self._buffer(kind, name).append(seconds)
+
+    # Time the body of a with block, e.g. one page render
+    @contextmanager
+    def measure(self, kind, name):
+        samples = self._buffer(kind, name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    # Decorator timing every call of a helper under its qualified name
+    def timed(self, func):
+        samples = self._buffer(FUNCTION, func.__qualname__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return wrapper
+
+    # p50/p95/p99 and max in milliseconds per recorded page and function,
+    # slowest p95 first
+    def summary(self):
+        rows = []
+        for (kind, name), samples in list(self._samples.items()):
+            # list() of a deque runs in C without releasing the GIL, so it is
+            # a consistent snapshot even while other sessions keep recording
+            values = np.array(list(samples)) * 1e3
+            if not len(values):
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            rows.append((kind, name, len(values), p50, p95, p99, values.max()))
+        return pd.DataFrame(rows, columns=SUMMARY_COLUMNS).sort_values('p95 (ms)', ascending=False, ignore_index=True)
+
+    def clear(self):
+        for samples in list(self._samples.values()):
+            samples.clear()
+
+
+# The recorder every page and helper of this process reports to
+timings = TimingRecorder()
+timed = timings.timed
+
+
+# Run func under cProfile and return its result with the report of the
+# `limit` most expensive calls by cumulative time. The report is None when
+# another profiler is already active (Python 3.12+ allows only one per process).
+def profile_call(func, limit=40):
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return func(), None
+    try:
+        result = func()
+    finally:
+        profiler.disable()
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(limit)
+    return result, report.getvalue()
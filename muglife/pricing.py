@@ -0,0 +1,107 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from muglife.perf import timed
+
+# Columns of the frame returned by PricingEngine.price_carts
+CART_PRICE_COLUMNS = ['Subtotal', 'Daily Offer', 'Total']
+
+
+# Menu prices, add-on prices and daily offers compiled into flat arrays.
+# A line item's price is base[coffee, size] plus its add-ons, times quantity;
+# the day's offer is a per-coffee discount rate compiled once per day, so a
+# whole batch of carts is priced with a few array lookups and one bincount.
+class PricingEngine:
+    def __init__(self, coffee_menu, add_on_prices, daily_offers):
+        self.coffees = list(coffee_menu)
+        self.sizes = list(next(iter(coffee_menu.values())))
+        self.add_on_prices = dict(add_on_prices)
+        self._daily_offers = daily_offers
+
+        self._coffee_codes = {coffee: i for i, coffee in enumerate(self.coffees)}
+        self._size_codes = {size: j for j, size in enumerate(self.sizes)}
+        # Per-cup add-on cost of each stored add-on string seen so far
+        self._add_on_costs = {}
+
+        # One extra zero row/column so unknown coffees or sizes (code -1) cost nothing
+        self.base = np.zeros((len(self.coffees) + 1, len(self.sizes) + 1))
+        for i, coffee in enumerate(self.coffees):
+            for j, size in enumerate(self.sizes):
+                self.base[i, j] = coffee_menu[coffee][size]
+
+        # (day, offer, per-coffee discount rates) for the day compiled last
+        self._today = (None, {}, np.zeros(len(self.coffees) + 1))
+        self._lock = threading.Lock()
+
+    # The day's offer and its discount rate per coffee code, compiled on the
+    # first call of each day and served from memory after that
+    def _compiled_offer(self, day):
+        compiled = self._today
+        if compiled[0] != day:
+            with self._lock:
+                compiled = self._today
+                if compiled[0] != day:
+                    offer = self._daily_offers.get(day.strftime('%A'), {})
+                    rates = np.zeros(len(self.coffees) + 1)
+                    if offer:
+                        if offer['coffee'] is None:
+                            rates[:-1] = offer['discount']
+                        else:
+                            rates[self._coffee_codes[offer['coffee']]] = offer['discount']
+                    compiled = self._today = (day, offer, rates)
+        return compiled
+
+    # The daily special offer for a date ({} when there is none)
+    def daily_offer(self, day):
+        return self._compiled_offer(day)[1]
+
+    # Price of one line item before offers; add_ons is a list or the stored
+    # comma-separated string ('None' when there are no add-ons)
+    def line_price(self, coffee_type, size, quantity, add_ons):
+        coffee_code = self._coffee_codes.get(coffee_type)
+        if coffee_code is None:
+            raise ValueError(f"Unknown coffee: {coffee_type!r}")
+        size_code = self._size_codes.get(size)
+        if size_code is None:
+            raise ValueError(f"Unknown size: {size!r}")
+        per_cup = self.base[coffee_code, size_code] + self._add_on_cost(add_ons)
+        return float(per_cup * quantity)
+
+    # Per-cup cost of a line's add-ons, given as a list or the stored string.
+    # line_price and price_carts both price add-ons here, so a line costs the
+    # same in the cart and in the ledger. Only a handful of distinct strings
+    # exist, so each is priced once and then served from the dict.
+    def _add_on_cost(self, add_ons):
+        if not isinstance(add_ons, str):
+            add_ons = ', '.join(add_ons) or 'None'
+        cost = self._add_on_costs.get(add_ons)
+        if cost is None:
+            names = [] if add_ons in ('', 'None') else add_ons.split(', ')
+            if any(name not in self.add_on_prices for name in names):
+                raise ValueError(f"Unknown add-ons: {add_ons!r}")
+            cost = self._add_on_costs[add_ons] = sum(self.add_on_prices[name] for name in names)
+        return cost
+
+    # Price many carts (lists of temp_orders line items) in one vectorized pass.
+    # The day's offer applies to every line of the coffee it names, or to every
+    # line when it names no coffee. Returns a frame with one row per cart.
+    @timed
+    def price_carts(self, carts, day):
+        cart_index = np.repeat(np.arange(len(carts)), [len(cart) for cart in carts])
+        lines = [line for cart in carts for line in cart]
+        count = len(lines)
+
+        # Line items are dicts, so their codes come from plain dict lookups
+        coffee_codes = np.fromiter((self._coffee_codes.get(line['Coffee Type'], -1) for line in lines), np.intp, count)
+        size_codes = np.fromiter((self._size_codes.get(line['Size'], -1) for line in lines), np.intp, count)
+        add_on_costs = np.fromiter((self._add_on_cost(line['Add-ons']) for line in lines), float, count)
+        quantities = np.fromiter((line['Quantity'] for line in lines), float, count)
+        line_prices = (self.base[coffee_codes, size_codes] + add_on_costs) * quantities
+
+        offers = line_prices * self._compiled_offer(day)[2][coffee_codes]
+        subtotal = np.bincount(cart_index, weights=line_prices, minlength=len(carts))
+        daily_offer = np.bincount(cart_index, weights=offers, minlength=len(carts))
+        return pd.DataFrame({'Subtotal': subtotal, 'Daily Offer': daily_offer, 'Total': subtotal - daily_offer},
+                            columns=CART_PRICE_COLUMNS)
@@ -0,0 +1,80 @@
+import pandas as pd
+
+from muglife.perf import timed
+
+# Columns of the rollup frame returned to the reports. 'Coffee Type', 'Size',
+# 'Add-ons' and 'Quantity' match the order frame, so the usage kernel works on
+# buckets exactly as it does on individual orders.
+ROLLUP_COLUMNS = ['Day', 'Coffee Type', 'Size', 'Add-ons', 'Orders', 'Quantity', 'Revenue']
+
+_UPSERT = '''INSERT INTO sales_rollup (branch, day, coffee_type, size, add_ons, orders, quantity, revenue)
+             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+             ON CONFLICT (branch, day, coffee_type, size, add_ons) DO UPDATE SET
+                 orders = orders + excluded.orders,
+                 quantity = quantity + excluded.quantity,
+                 revenue = revenue + excluded.revenue'''
+
+
+# Create the per-branch daily sales rollup, backfilling it from the orders
+# table the first time it is created on an existing database.
+# Buckets are keyed by (branch, day, coffee type, size, add-ons); add-ons only
+# have a few distinct values and keep ingredient usage computable per bucket.
+def init_rollups(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS sales_rollup (
+                    branch TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    coffee_type TEXT NOT NULL,
+                    size TEXT NOT NULL,
+                    add_ons TEXT NOT NULL,
+                    orders INTEGER NOT NULL,
+                    quantity INTEGER NOT NULL,
+                    revenue REAL NOT NULL,
+                    PRIMARY KEY (branch, day, coffee_type, size, add_ons)
+                ) WITHOUT ROWID''')
+    empty = conn.execute('SELECT NOT EXISTS (SELECT 1 FROM sales_rollup)').fetchone()[0]
+    if empty:
+        conn.execute('''INSERT INTO sales_rollup (branch, day, coffee_type, size, add_ons, orders, quantity, revenue)
+                        SELECT branch, substr(time, 1, 10), coffee_type, size, COALESCE(add_ons, 'None'),
+                               COUNT(*), SUM(quantity), SUM(price)
+                        FROM orders
+                        GROUP BY branch, substr(time, 1, 10), coffee_type, size, COALESCE(add_ons, 'None')''')
+    conn.commit()
+
+
+# Fold newly committed order rows into their buckets.
+# Runs inside the caller's transaction so the rollup never drifts from the ledger.
+def add_to_rollups(conn, orders):
+    buckets = {}
+    for order in orders:
+        key = (order['Branch'], str(order['Time'])[:10], order['Coffee Type'], order['Size'], order['Add-ons'] or 'None')
+        count, quantity, revenue = buckets.get(key, (0, 0, 0.0))
+        buckets[key] = (count + 1, quantity + int(order['Quantity']), revenue + float(order['Price']))
+    conn.executemany(_UPSERT, [key + totals for key, totals in buckets.items()])
+
+
+# Buckets for a branch between two days (inclusive, 'YYYY-MM-DD'), as a DataFrame
+@timed
+def load_rollups(conn, branch, start_day=None, end_day=None):
+    clauses, params = ['branch = ?'], [branch]
+    if start_day is not None:
+        clauses.append('day >= ?')
+        params.append(start_day)
+    if end_day is not None:
+        clauses.append('day <= ?')
+        params.append(end_day)
+    rows = conn.execute(
+        f'''SELECT day, coffee_type, size, add_ons, orders, quantity, revenue
+            FROM sales_rollup WHERE {' AND '.join(clauses)}''',
+        params
+    ).fetchall()
+    return pd.DataFrame(rows, columns=ROLLUP_COLUMNS)
+
+
+# All-time (order count, revenue) for a branch
+@timed
+def rollup_totals(conn, branch):
+    orders, revenue = conn.execute(
+        'SELECT COALESCE(SUM(orders), 0), COALESCE(SUM(revenue), 0) FROM sales_rollup WHERE branch = ?',
+        (branch,)
+    ).fetchone()
+    return orders, revenue
@@ -0,0 +1,311 @@
+# Minimal asyncio HTTP/JSON endpoint over CoffeeShopService, for POS terminals
+# and kiosks that submit orders and poll their status without going through a
+# Streamlit rerun. It uses only the standard library and is meant for
+# localhost or a trusted shop network.
+#
+#   GET  /health
+#   GET  /menu                                  menu, add-ons and today's offer
+#   POST /quote                                 {"cart": [...], "coupon_code"?, "customer_id"?, "points_to_redeem"?}
+#   POST /orders                                {"customer_name": ..., "cart": [...], ...same as /quote}
+#   GET  /orders/<branch>/<order_number>        current status
+#   POST /orders/<branch>/<order_number>/ready  kitchen marks the order ready
+#   POST /orders/<branch>/<order_number>/pickup counter hands the order over
+#   GET  /queues/<processing|ready>?branch=&offset=&limit=
+#   GET  /metrics                               Prometheus text format
+#
+# Cart lines use the same keys as the UI cart: "Coffee Type", "Size",
+# "Quantity", "Add-ons" (list or string) and "Branch".
+#
+# Service calls touch SQLite, so each runs in a worker thread and the event
+# loop keeps accepting and polling other connections meanwhile.
+# Run it standalone with:
+#
+#     python -m muglife.server [--db coffee_shop.db] [--host 127.0.0.1] [--port 8765]
+#
+# or inside the Streamlit process (sharing its queues and stock) by setting
+# MUGLIFE_API_PORT before starting the app.
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+import threading
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from muglife.kitchen import PROCESSING, READY
+from muglife.coupons import CouponUnavailable
+from muglife.loyalty import InsufficientPoints
+from muglife.menu import FIXED_BRANCHES, add_on_prices, coffee_menu
+from muglife.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from muglife.service import CoffeeShopService, normalize_line, order_summary
+
+MAX_BODY_BYTES = 1 << 20
+QUEUE_STATUSES = {'processing': PROCESSING, 'ready': READY}
+MAX_PAGE_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+# Raised by a handler to answer with an error status and message
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _branch(name):
+    branch = unquote(name)
+    if branch not in FIXED_BRANCHES:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown branch: {branch}")
+    return branch
+
+
+def _order_number(text):
+    if not text.isdigit():
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Invalid order number: {text}")
+    return int(text)
+
+
+def _int_param(query, name, default):
+    try:
+        return int(query.get(name, [default])[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# The cart, coupon, customer and points of a /quote or /orders body, checked
+# for their JSON types so nothing malformed reaches the service or SQLite
+def _cart_args(body):
+    cart = body.get('cart')
+    if not isinstance(cart, list) or not all(isinstance(line, dict) for line in cart):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "cart must be a list of line items")
+    coupon_code = body.get('coupon_code')
+    if coupon_code is not None and not isinstance(coupon_code, str):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "coupon_code must be a string")
+    customer_id = body.get('customer_id')
+    if customer_id is not None and not _is_int(customer_id):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "customer_id must be an integer")
+    points = body.get('points_to_redeem')
+    if points is None:
+        points = 0
+    if not _is_int(points) or points < 0:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "points_to_redeem must be a non-negative integer")
+    return cart, coupon_code, customer_id, points
+
+
+# Request handlers. Each takes the service, the path parameters, the query
+# and the JSON body, runs in a worker thread and returns (status, payload).
+# A str payload is sent as Prometheus text, anything else as JSON.
+
+def health(service, params, query, body):
+    return HTTPStatus.OK, {'status': 'ok'}
+
+
+def menu(service, params, query, body):
+    return HTTPStatus.OK, {
+        'branches': FIXED_BRANCHES,
+        'coffees': coffee_menu,
+        'add_ons': add_on_prices,
+        'daily_offer': service.daily_offer(),
+    }
+
+
+def quote(service, params, query, body):
+    cart, coupon_code, customer_id, points = _cart_args(body)
+    try:
+        cart = [normalize_line(line) for line in cart]
+        return HTTPStatus.OK, service.quote(cart, coupon_code, customer_id, points)
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+
+
+def place_order(service, params, query, body):
+    cart, coupon_code, customer_id, points = _cart_args(body)
+    customer_name = body.get('customer_name')
+    if not isinstance(customer_name, str) or not customer_name:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "customer_name is required")
+    try:
+        orders, shortage, order_quote = service.place_order(customer_name, cart, coupon_code, customer_id, points)
+    except ValueError as e:
+        raise ApiError(HTTPStatus.BAD_REQUEST, str(e))
+    except CouponUnavailable:
+        raise ApiError(HTTPStatus.CONFLICT, "The coupon is no longer valid")
+    except InsufficientPoints:
+        raise ApiError(HTTPStatus.CONFLICT, "Not enough loyalty points")
+    if shortage:
+        branch, item = shortage
+        return HTTPStatus.CONFLICT, {'error': 'out_of_stock', 'branch': branch, 'item': item}
+    return HTTPStatus.CREATED, {'orders': [order_summary(order) for order in orders], 'quote': order_quote}
+
+
+def order_status(service, params, query, body):
+    branch, number = _branch(params[0]), _order_number(params[1])
+    status = service.order_status(branch, number)
+    if status is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, "No such order")
+    return HTTPStatus.OK, {'branch': branch, 'order_number': number, 'status': status}
+
+
+def _advance(move):
+    def handler(service, params, query, body):
+        branch, number = _branch(params[0]), _order_number(params[1])
+        if not move(service, branch, number):
+            raise ApiError(HTTPStatus.CONFLICT, "The order is not in the expected state")
+        return HTTPStatus.OK, {'branch': branch, 'order_number': number, 'status': service.order_status(branch, number)}
+    return handler
+
+
+def metrics(service, params, query, body):
+    return HTTPStatus.OK, service.metrics.render()
+
+
+def queue(service, params, query, body):
+    status = QUEUE_STATUSES.get(params[0])
+    if status is None:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown queue: {params[0]}")
+    branch = _branch(query['branch'][0]) if 'branch' in query else None
+    offset = max(0, _int_param(query, 'offset', 0))
+    limit = min(MAX_PAGE_SIZE, max(1, _int_param(query, 'limit', 20)))
+    return HTTPStatus.OK, {
+        'total': service.queue_count(status, branch),
+        'orders': [order_summary(order) for order in service.queue_page(status, offset, limit, branch)],
+    }
+
+
+ROUTES = [
+    ('GET', re.compile(r'/health'), health),
+    ('GET', re.compile(r'/menu'), menu),
+    ('POST', re.compile(r'/quote'), quote),
+    ('POST', re.compile(r'/orders'), place_order),
+    ('GET', re.compile(r'/orders/([^/]+)/([^/]+)'), order_status),
+    ('POST', re.compile(r'/orders/([^/]+)/([^/]+)/ready'), _advance(lambda service, b, n: service.mark_ready(b, n))),
+    ('POST', re.compile(r'/orders/([^/]+)/([^/]+)/pickup'), _advance(lambda service, b, n: service.pickup(b, n))),
+    ('GET', re.compile(r'/queues/([^/]+)'), queue),
+    ('GET', re.compile(r'/metrics'), metrics),
+]
+
+
+def _route(method, path):
+    allowed = False
+    for route_method, pattern, handler in ROUTES:
+        match = pattern.fullmatch(path)
+        if match:
+            if route_method == method:
+                return handler, match.groups()
+            allowed = True
+    raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED if allowed else HTTPStatus.NOT_FOUND, f"{method} {path}")
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length < 0:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+def _response(status, payload, keep_alive):
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), METRICS_CONTENT_TYPE
+    else:
+        body, content_type = json.dumps(payload, default=str).encode(), 'application/json'
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode('latin-1') + body
+
+
+# Serve one client connection, keeping it open between requests (HTTP/1.1
+# keep-alive) so polling terminals don't reconnect for every status check
+async def _handle_connection(service, reader, writer):
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, raw_body = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                url = urlsplit(target)
+                handler, params = _route(method, url.path)
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                except ValueError:
+                    raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+                if not isinstance(body, dict):
+                    raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+                status, payload = await asyncio.to_thread(handler, service, params, parse_qs(url.query), body)
+            except ApiError as e:
+                status, payload = e.status, {'error': e.message}
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except Exception:
+                # A bug, not a bad request: log it and answer with a bare 500
+                logger.exception("Request failed")
+                status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'Internal server error'}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=8765):
+    server = await asyncio.start_server(lambda r, w: _handle_connection(service, r, w), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+# Run the endpoint on its own event loop in a daemon thread, e.g. inside the
+# Streamlit process so the API and the UI share one service
+def serve_in_thread(service, host='127.0.0.1', port=8765):
+    thread = threading.Thread(target=asyncio.run, args=(serve(service, host, port),), daemon=True, name='muglife-api')
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON endpoint for the coffee shop service")
+    parser.add_argument('--db', default='coffee_shop.db')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    service = CoffeeShopService(args.db)
+    print(f"Serving on http://{args.host}:{args.port}")
+    asyncio.run(serve(service, args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
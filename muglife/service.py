@@ -0,0 +1,280 @@
+import time
+from datetime import datetime
+
+from muglife.accounts import init_accounts
+from muglife.checkout import commit_cart
+from muglife.coupons import find_coupon, init_coupons
+from muglife.db import ConnectionPool
+from muglife.feedback import init_feedback
+from muglife.forecast import ConsumptionForecaster
+from muglife.inventory import InventoryEngine
+from muglife.kitchen import PICKED_UP, PROCESSING, READY, KitchenBoard, prep_time
+from muglife.ledger import find_order_status, init_ledger, load_active_orders, load_orders, set_order_status
+from muglife.loyalty import POINT_VALUE, InsufficientPoints, init_loyalty, loyalty_balance
+from muglife.metrics import ShopMetrics
+from muglife.menu import FIXED_BRANCHES, coffee_menu, pricing_engine, usage_table
+from muglife.order_numbers import OrderNumberAllocator, init_order_numbers, pickup_code
+from muglife.perf import timed
+
+# Opening stock of every branch
+DEFAULT_STOCK = {
+    "coffee_beans": 1000,
+    "milk": 1000,
+    "sugar": 1000,
+    "cups": 500
+}
+
+
+# Create every table the app needs if it doesn't exist yet
+def init_schema(conn):
+    init_accounts(conn)
+    init_ledger(conn)
+    init_order_numbers(conn)
+    init_feedback(conn)
+    init_coupons(conn)
+    init_loyalty(conn)
+
+
+# Check a cart line (as sent by the UI or an HTTP client) and rebuild it with
+# a server-side price and prep time. add_ons may be a list or the stored
+# comma-separated string. Raises ValueError for anything not on the menu,
+# values of the wrong type and repeated add-ons.
+def normalize_line(line):
+    if not isinstance(line, dict):
+        raise ValueError(f"Invalid cart line: {line!r}")
+    coffee_type, size, branch = line.get('Coffee Type'), line.get('Size'), line.get('Branch')
+    if not isinstance(coffee_type, str) or coffee_type not in coffee_menu:
+        raise ValueError(f"Unknown coffee: {coffee_type!r}")
+    if not isinstance(size, str) or size not in coffee_menu[coffee_type]:
+        raise ValueError(f"Unknown size: {size!r}")
+    if not isinstance(branch, str) or branch not in FIXED_BRANCHES:
+        raise ValueError(f"Unknown branch: {branch!r}")
+    quantity = line.get('Quantity', 1)
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+        raise ValueError(f"Invalid quantity: {quantity!r}")
+    add_ons = line.get('Add-ons') or 'None'
+    if isinstance(add_ons, str):
+        names = [] if add_ons == 'None' else add_ons.split(', ')
+    elif isinstance(add_ons, (list, tuple)) and all(isinstance(name, str) for name in add_ons):
+        names = list(add_ons)
+    else:
+        raise ValueError(f"Invalid add-ons: {add_ons!r}")
+    if any(name not in pricing_engine.add_on_prices for name in names):
+        raise ValueError(f"Unknown add-ons: {add_ons!r}")
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate add-ons: {add_ons!r}")
+    add_ons = ', '.join(names) or 'None'
+    return {
+        'Coffee Type': coffee_type,
+        'Size': size,
+        'Quantity': quantity,
+        'Add-ons': add_ons,
+        'Price': pricing_engine.line_price(coffee_type, size, quantity, add_ons),
+        'Branch': branch,
+        'Prep Time': prep_time(size, add_ons),
+    }
+
+
+# The shop's business logic without any Streamlit dependency: orders, pricing,
+# stock and the kitchen queues, plus the database they are kept in.
+# One instance is shared by every Streamlit session of a process and by the
+# HTTP endpoint in muglife.server, so all clients see the same queues and stock.
+class CoffeeShopService:
+    def __init__(self, db_path, initial_stock=DEFAULT_STOCK):
+        self.pool = ConnectionPool(db_path)
+        with self.pool.connection() as conn:
+            init_schema(conn)
+            self.kitchen = KitchenBoard.from_orders(FIXED_BRANCHES, load_active_orders(conn))
+        self.inventory = InventoryEngine(FIXED_BRANCHES, initial_stock)
+        self.order_numbers = OrderNumberAllocator()
+        self.metrics = ShopMetrics()
+        self.forecaster = ConsumptionForecaster(
+            FIXED_BRANCHES, usage_table.ingredients + ['cups'], usage_table.average_per_cup()
+        )
+        now = datetime.now()
+        with self.pool.connection() as conn:
+            recent_orders = load_orders(conn, since=self.forecaster.history_since(now))
+        self.forecaster.load_history(recent_orders, usage_table, now)
+        for branch in FIXED_BRANCHES:
+            self._stock_changed(branch)
+            self._queue_changed(branch, PROCESSING)
+            self._queue_changed(branch, READY)
+
+    # Stock
+
+    def restock(self, branch, item, amount):
+        level = self.inventory.restock(branch, item, amount)
+        self.metrics.stock_level.set(branch, item, value=level)
+
+    def stock(self, branch):
+        return self.inventory.snapshot(branch)
+
+    # Use per hour and hours until stockout of every item at a branch, and the
+    # cups its stock still makes, from the branch's recent consumption
+    def stock_forecast(self, branch):
+        return self.forecaster.forecast(branch, self.inventory.snapshot(branch), datetime.now())
+
+    def _stock_changed(self, branch):
+        self.metrics.stock_changed(branch, self.inventory.snapshot(branch))
+
+    # Pricing
+
+    def daily_offer(self, day=None):
+        return pricing_engine.daily_offer(day or datetime.now().date())
+
+    # Every amount the checkout shows for a cart, computed server side:
+    # subtotal, daily offer, coupon and loyalty discounts, the total to pay
+    # and the estimated wait, with amounts rounded to cents. coupon_discount
+    # is None for an unknown or expired code, and the points only count while
+    # the customer's balance covers them. Raises ValueError for a negative
+    # number of points or points without a customer.
+    @timed
+    def quote(self, cart, coupon_code=None, customer_id=None, points_to_redeem=0):
+        if not isinstance(points_to_redeem, int) or isinstance(points_to_redeem, bool) or points_to_redeem < 0:
+            raise ValueError(f"Invalid points to redeem: {points_to_redeem!r}")
+        if points_to_redeem and customer_id is None:
+            raise ValueError("Loyalty points can only be redeemed by a signed-in customer")
+        today = datetime.now().date()
+        if cart:
+            price = pricing_engine.price_carts([cart], today).iloc[0]
+            subtotal, daily_offer = round(float(price['Subtotal']), 2), round(float(price['Daily Offer']), 2)
+        else:
+            subtotal = daily_offer = 0.0
+        with self.pool.connection() as conn:
+            coupon_discount = find_coupon(conn, coupon_code, today) if coupon_code else 0.0
+            points_balance = loyalty_balance(conn, customer_id) if customer_id is not None else 0
+        if coupon_discount is not None:
+            coupon_discount = round(coupon_discount, 2)
+        loyalty_discount = round(points_to_redeem * POINT_VALUE, 2) if points_to_redeem <= points_balance else 0.0
+        return {
+            'subtotal': subtotal,
+            'daily_offer': daily_offer,
+            'coupon_discount': coupon_discount,
+            'points_balance': points_balance,
+            'loyalty_discount': loyalty_discount,
+            'total': round(max(0.0, subtotal - daily_offer - (coupon_discount or 0.0) - loyalty_discount), 2),
+            'wait_seconds': self.wait_seconds(cart),
+        }
+
+    # Estimated wait for a cart: the prep time already queued at each of its
+    # branches plus its own items there; the slowest branch wins
+    def wait_seconds(self, cart):
+        cart_prep_time = {}
+        for line in cart:
+            cart_prep_time[line['Branch']] = cart_prep_time.get(line['Branch'], 0) + line['Prep Time']
+        return max((
+            self.kitchen.outstanding_seconds(branch) + seconds
+            for branch, seconds in cart_prep_time.items()
+        ), default=0)
+
+    # Loyalty
+
+    # A customer's current point balance; 0 without a signed-in customer
+    def points_balance(self, customer_id):
+        if customer_id is None:
+            return 0
+        with self.pool.connection() as conn:
+            return loyalty_balance(conn, customer_id)
+
+    # Orders
+
+    # Price and commit a cart as one unit. Lines are re-checked and re-priced
+    # server side, and the coupon only applies while it is valid.
+    # Returns (orders, shortage, quote) where shortage is None or (branch, item);
+    # raises ValueError for an invalid cart or points, CouponUnavailable if the
+    # coupon expired or was pruned after the quote, and InsufficientPoints if
+    # the points to redeem are not (or no longer) available.
+    @timed
+    def place_order(self, customer_name, cart, coupon_code=None, customer_id=None, points_to_redeem=0):
+        cart = [normalize_line(line) for line in cart]
+        if not cart:
+            raise ValueError("The cart is empty")
+        quote = self.quote(cart, coupon_code, customer_id, points_to_redeem)
+        # The quote gave no discount for points the balance doesn't cover;
+        # commit_cart checks the balance again in the redeeming transaction
+        if points_to_redeem > quote['points_balance']:
+            raise InsufficientPoints(points_to_redeem)
+        coupon_code = coupon_code if quote['coupon_discount'] else None
+        order_time = datetime.now().replace(microsecond=0)
+        start = time.perf_counter()
+        with self.pool.connection() as conn:
+            orders, shortage = commit_cart(
+                conn, cart, customer_name, order_time, self.inventory, self.kitchen, usage_table, self.order_numbers,
+                coupon_code=coupon_code, customer_id=customer_id, points_to_redeem=points_to_redeem,
+                amount_paid=quote['total']
+            )
+        if shortage:
+            self.metrics.cart_rejected(*shortage)
+        else:
+            self.metrics.cart_committed(orders, time.perf_counter() - start, coupon_code, points_to_redeem)
+            for line in cart:
+                needs = usage_table.needs(line['Coffee Type'], line['Size'], line['Quantity'], line['Add-ons'])
+                self.forecaster.record(line['Branch'], needs, order_time)
+            for branch in {order['Branch'] for order in orders}:
+                self._stock_changed(branch)
+                self._queue_changed(branch, PROCESSING)
+        return orders, shortage, quote
+
+    # Status of an order: straight from the kitchen queues while it is active,
+    # from the ledger once it has been picked up. None if there is no such order.
+    def order_status(self, branch, order_number):
+        order = self.kitchen.find(branch, order_number)
+        if order is not None:
+            return order['Status']
+        with self.pool.connection() as conn:
+            return find_order_status(conn, branch, order_number)
+
+    # Kitchen
+
+    # Move an order from the kitchen to the pickup counter; False if it was not
+    # being processed (e.g. another terminal already moved it)
+    def mark_ready(self, branch, order_number):
+        return self._advance(branch, order_number, PROCESSING, READY, self.kitchen.mark_ready)
+
+    def pickup(self, branch, order_number):
+        return self._advance(branch, order_number, READY, PICKED_UP, self.kitchen.pickup)
+
+    # The ledger is written first, and its conditional UPDATE decides which
+    # terminal wins a race. The queue only moves once the status is stored,
+    # so a failed write leaves the board and the ledger in step.
+    def _advance(self, branch, order_number, current_status, new_status, move):
+        with self.pool.connection() as conn:
+            if not set_order_status(conn, branch, order_number, current_status, new_status):
+                return False
+        move(branch, order_number)
+        self._queue_changed(branch, current_status)
+        if new_status != PICKED_UP:
+            self._queue_changed(branch, new_status)
+        return True
+
+    def _queue_changed(self, branch, status):
+        self.metrics.queue_changed(branch, status, self.kitchen.count(branch, status), self.kitchen.oldest(branch, status))
+
+    # Number of active orders in a status, at one branch or across all of them
+    def queue_count(self, status, branch=None):
+        if branch is None:
+            return self.kitchen.count_all(status)
+        return self.kitchen.count(branch, status)
+
+    # One page of active orders in a status, oldest first
+    def queue_page(self, status, offset, limit, branch=None):
+        if branch is None:
+            return self.kitchen.page_all(status, offset, limit)
+        return self.kitchen.page(branch, status, offset, limit)
+
+
+# An order row as a JSON-friendly dict for API clients
+def order_summary(order):
+    return {
+        'branch': order['Branch'],
+        'order_number': int(order['Order Number']),
+        'pickup_code': pickup_code(order['Branch'], order['Order Number']),
+        'customer_name': order['Customer Name'],
+        'coffee_type': order['Coffee Type'],
+        'size': order['Size'],
+        'quantity': int(order['Quantity']),
+        'add_ons': order['Add-ons'],
+        'price': float(order['Price']),
+        'time': str(order['Time']),
+        'status': order['Status'],
+    }
@@ -0,0 +1,207 @@
+import html
+import re
+
+
+# Collapse indented HTML/CSS source into a single compact line
+def _compact(source):
+    return re.sub(r'\s*\n\s*', '', source.strip())
+
+
+# A card layout compiled once at import time.
+# The indented template source is collapsed to one line and its format_map
+# bound up front, so rendering a card is a single format call. String fields
+# are HTML-escaped, which keeps customer names and comments from injecting
+# markup into the page.
+class CardTemplate:
+    def __init__(self, template):
+        self._format = _compact(template).format_map
+
+    def render(self, fields):
+        return self._format({
+            key: html.escape(value) if isinstance(value, str) else value
+            for key, value in fields.items()
+        })
+
+    # Render fields that are already escaped or are trusted markup, such as
+    # rows rendered by another template, without escaping them again
+    def render_trusted(self, fields):
+        return self._format(fields)
+
+    # Render a whole list of cards as one HTML string, to be sent as one element
+    def render_all(self, items, container_class='card-list'):
+        return f"<div class='{container_class}'>{''.join(self.render(item) for item in items)}</div>"
+
+
+# Every style used by the card views, sent as one compact <style> element per
+# rerun instead of a separate block per page and inline styles on every card
+STYLESHEET = '<style>' + _compact('''
+    .menu-container {
+        background-color: #ffffff;
+        padding: 20px;
+        border-radius: 15px;
+        box-shadow: 0px 4px 8px rgba(0, 0, 0, 0.1);
+        margin-bottom: 40px;
+    }
+    .menu-title {
+        color: #2C3E50;
+        font-size: 28px;
+        font-weight: bold;
+        margin-bottom: 25px;
+        text-align: center;
+    }
+    .menu-item-box {
+        background-color: #f9f9f9;
+        padding: 20px;
+        border-radius: 10px;
+        box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.05);
+        margin-bottom: 20px;
+        display: flex;
+        justify-content: space-between;
+        align-items: center;
+    }
+    .item-title {
+        font-size: 22px;
+        font-weight: bold;
+        color: #34495E;
+    }
+    .item-prices {
+        font-size: 18px;
+        color: #3498DB;
+        text-align: right;
+    }
+    .addon-section {
+        margin-top: 30px;
+        background-color: #f9f9f9;
+        padding: 15px;
+        border-radius: 10px;
+        box-shadow: 0px 2px 5px rgba(0, 0, 0, 0.05);
+    }
+    .addon-title {
+        font-size: 20px;
+        font-weight: bold;
+        color: #27AE60;
+        margin-bottom: 10px;
+    }
+    .addon-item {
+        font-size: 16px;
+        color: #2C3E50;
+        margin-top: 5px;
+    }
+    .order-card {
+        border: 1px solid #d9d9d9;
+        border-radius: 10px;
+        padding: 15px;
+        margin-bottom: 10px;
+        background-color: #f9f9f9;
+    }
+    .feedback-card {
+        border: 1px solid #d9d9d9;
+        border-radius: 10px;
+        padding: 15px;
+        margin-bottom: 15px;
+        background-color: #f9f9f9;
+    }
+    .feedback-card h4 {
+        color: #333;
+    }
+    .feedback-comment {
+        color: #666;
+    }
+    .feedback-time {
+        color: #999;
+        font-size: 0.85em;
+    }
+    .inventory-table, .restock-table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: 20px 0;
+        font-size: 18px;
+        text-align: left;
+    }
+    .inventory-table th, .inventory-table td, .restock-table th, .restock-table td {
+        padding: 12px 15px;
+        border: 1px solid #ddd;
+    }
+    .inventory-table th, .restock-table th {
+        background-color: #f4f4f4;
+        font-weight: bold;
+    }
+    .inventory-table th {
+        color: #333;
+    }
+    .inventory-table td, .restock-table td {
+        background-color: #ffffff;
+    }
+    .inventory-table td {
+        color: #555;
+    }
+    .inventory-table tbody tr:nth-child(even) td, .restock-table tbody tr:nth-child(even) td {
+        background-color: #f9f9f9;
+    }
+''') + '</style>'
+
+MENU_ITEM = CardTemplate('''
+    <div class="menu-item-box">
+        <div class="item-title">{coffee}</div>
+        <div class="item-prices">
+            Small: RM{small:.2f} <br>
+            Medium: RM{medium:.2f} <br>
+            Large: RM{large:.2f}
+        </div>
+    </div>
+''')
+
+ADD_ON_ITEM = CardTemplate('''
+    <div class="addon-item">{add_on}: RM{price:.2f}</div>
+''')
+
+# Used by the kitchen and the pickup screens
+ORDER_CARD = CardTemplate('''
+    <div class="order-card">
+        <strong>Order #{pickup_code}</strong><br>
+        <strong>Customer:</strong> {customer}<br>
+        <strong>Coffee:</strong> {coffee} ({size})<br>
+        <strong>Add-ons:</strong> {add_ons}<br>
+        <strong>Order Time:</strong> {time}<br>
+    </div>
+''')
+
+FEEDBACK_CARD = CardTemplate('''
+    <div class="feedback-card">
+        <h4>Customer Name: {name}</h4>
+        <p><strong>Coffee Purchased:</strong> {coffee}</p>
+        <p><strong>Coffee Rating:</strong> {coffee_stars} ({coffee_rating}/5)</p>
+        <p><strong>Service Rating:</strong> {service_stars} ({service_rating}/5)</p>
+        <p><strong>Comments:</strong> <span class="feedback-comment">{comments}</span></p>
+        <p class="feedback-time">Submitted on {time}</p>
+    </div>
+''')
+
+TABLE_ROW = CardTemplate('''
+    <tr><td>{item}</td><td>{value}</td><td>{unit}</td></tr>
+''')
+
+TABLE = CardTemplate('''
+    <table class="{table_class}">
+        <thead><tr><th>Item</th><th>{value_header}</th><th>Unit</th></tr></thead>
+        <tbody>{rows}</tbody>
+    </table>
+''')
+
+
+# Fields for ORDER_CARD from an order row
+def order_card_fields(order):
+    return {
+        'pickup_code': order['Pickup Code'],
+        'customer': order['Customer Name'],
+        'coffee': order['Coffee Type'],
+        'size': order['Size'],
+        'add_ons': order['Add-ons'],
+        'time': str(order['Time']),
+    }
+
+
+# One <table> element with a row per (item, value, unit)
+def render_table(table_class, value_header, rows):
+    body = ''.join(TABLE_ROW.render({'item': item, 'value': value, 'unit': unit}) for item, value, unit in rows)
+    return TABLE.render_trusted({'table_class': table_class, 'value_header': html.escape(value_header), 'rows': body})
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from muglife.perf import timed
+
+# Restock prices for these items are quoted per 100 units (g or ml); cups are per unit
+_PER_HUNDRED = {'coffee_beans', 'milk', 'sugar'}
+
+
+# Ingredient usage compiled into a dense (coffee x size x ingredient) array so the
+# usage of a whole order frame comes from one fancy-indexing lookup and a
+# multiply, instead of iterating over rows with dict lookups.
+class UsageTable:
+    def __init__(self, ingredient_usage, extra_usage):
+        self.coffees = list(ingredient_usage)
+        self.sizes = list(next(iter(ingredient_usage.values())))
+        self.ingredients = list(next(iter(next(iter(ingredient_usage.values())).values())))
+
+        # One extra zero row/column so unknown coffees or sizes (category code -1)
+        # contribute nothing, like the old per-row lookup that skipped them
+        self.base = np.zeros((len(self.coffees) + 1, len(self.sizes) + 1, len(self.ingredients)), dtype=np.int64)
+        for i, coffee in enumerate(self.coffees):
+            for j, size in enumerate(self.sizes):
+                recipe = ingredient_usage[coffee].get(size)
+                if recipe:
+                    self.base[i, j] = [recipe.get(ingredient, 0) for ingredient in self.ingredients]
+
+        # Add-on name (e.g. 'Extra milk') -> extra usage vector per cup
+        self.extras = {}
+        for ingredient, amount in extra_usage.items():
+            vector = np.zeros(len(self.ingredients), dtype=np.int64)
+            vector[self.ingredients.index(ingredient)] = amount
+            self.extras[f'Extra {ingredient}'] = vector
+
+    # Average ingredient usage of one cup over every coffee and size on the
+    # menu, without add-ons, as {ingredient: amount}
+    def average_per_cup(self):
+        recipes = self.base[:-1, :-1].reshape(-1, len(self.ingredients))
+        return dict(zip(self.ingredients, recipes.mean(axis=0).tolist()))
+
+    # Ingredients and cups needed for one line item, as {item: amount}
+    def needs(self, coffee_type, size, quantity, add_ons):
+        per_cup = self.base[self.coffees.index(coffee_type), self.sizes.index(size)]
+        for add_on, vector in self.extras.items():
+            if add_on in add_ons:
+                per_cup = per_cup + vector
+        needs = dict(zip(self.ingredients, (per_cup * quantity).tolist()))
+        needs['cups'] = quantity
+        return needs
+
+    # Usage of every row of an order frame as an (orders x ingredient) array
+    def per_order(self, frame):
+        coffee_codes = pd.Categorical(frame['Coffee Type'], categories=self.coffees).codes
+        size_codes = pd.Categorical(frame['Size'], categories=self.sizes).codes
+        per_cup = self.base[coffee_codes, size_codes]
+        known = (coffee_codes >= 0) & (size_codes >= 0)
+        # Only a handful of distinct add-on strings exist, so test each once and
+        # broadcast the result through the category codes
+        add_ons = pd.Categorical(frame['Add-ons'].astype(str))
+        for add_on, vector in self.extras.items():
+            in_category = np.array([add_on in category for category in add_ons.categories], dtype=bool)
+            has_add_on = in_category[add_ons.codes] & known
+            per_cup = per_cup + np.outer(has_add_on, vector)
+        quantity = frame['Quantity'].to_numpy(dtype=np.int64)
+        return per_cup * quantity[:, None]
+
+    # Total ingredient and cup usage of an order frame, as {item: amount}
+    @timed
+    def totals(self, frame):
+        totals = dict(zip(self.ingredients, self.per_order(frame).sum(axis=0).tolist()))
+        totals['cups'] = int(frame['Quantity'].sum())
+        return totals
+
+
+# Restock cost of the given usage totals at the given restock prices
+def restock_cost(totals, restock_prices):
+    items = list(totals)
+    amounts = np.array([totals[item] for item in items], dtype=float)
+    unit_prices = np.array([
+        restock_prices[item] / 100 if item in _PER_HUNDRED else restock_prices[item]
+        for item in items
+    ])
+    return float(amounts @ unit_prices)
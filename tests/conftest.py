@@ -0,0 +1,30 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from muglife.loyalty import accrue_points
+from muglife.service import CoffeeShopService
+
+
+# A service on a fresh database in the test's temporary directory
+@pytest.fixture
+def service(tmp_path):
+    return CoffeeShopService(str(tmp_path / 'coffee_shop.db'))
+
+
+# Create a customer holding `points` loyalty points and return their id
+@pytest.fixture
+def make_customer(service):
+    def make(username, points=0):
+        with service.pool.connection() as conn:
+            with conn:
+                customer_id = conn.execute(
+                    'INSERT INTO customers (username, password) VALUES (?, ?)', (username, 'x')
+                ).lastrowid
+                accrue_points(conn, customer_id, points, datetime.now(), 'Opening balance')
+        return customer_id
+    return make
@@ -0,0 +1,196 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+import muglife.service
+from muglife.coupons import add_coupon, load_coupons
+from muglife.kitchen import PICKED_UP, PROCESSING, READY
+from muglife.loyalty import POINT_VALUE, InsufficientPoints, points_earned
+from muglife.menu import FIXED_BRANCHES, add_on_prices, coffee_menu
+from muglife.service import DEFAULT_STOCK, CoffeeShopService, normalize_line
+
+BRANCH = FIXED_BRANCHES[0]
+
+
+def line(**fields):
+    return {'Coffee Type': 'Americano', 'Size': 'small', 'Quantity': 2, 'Branch': BRANCH, **fields}
+
+
+# Daily offer the service applies today to a cart of Americano
+def americano_offer(service, amount):
+    offer = service.daily_offer()
+    if offer and offer['coffee'] in (None, 'Americano'):
+        return round(amount * offer['discount'], 2)
+    return 0.0
+
+
+# normalize_line
+
+def test_normalize_line_reprices_on_the_server():
+    normalized = normalize_line(line(**{'Add-ons': ['Extra sugar', 'Extra milk'], 'Price': 0.01}))
+    assert normalized['Add-ons'] == 'Extra sugar, Extra milk'
+    assert normalized['Price'] == pytest.approx(
+        2 * (coffee_menu['Americano']['small'] + add_on_prices['Extra sugar'] + add_on_prices['Extra milk']))
+    assert normalized['Prep Time'] > 0
+
+
+def test_normalize_line_defaults():
+    normalized = normalize_line({'Coffee Type': 'Latte', 'Size': 'large', 'Branch': BRANCH})
+    assert normalized['Quantity'] == 1
+    assert normalized['Add-ons'] == 'None'
+
+
+@pytest.mark.parametrize('fields', [
+    {'Coffee Type': 'Tea'},
+    {'Coffee Type': ['Americano']},
+    {'Size': 'huge'},
+    {'Size': ['small']},
+    {'Branch': 'Nowhere'},
+    {'Branch': [BRANCH]},
+    {'Quantity': 0},
+    {'Quantity': '2'},
+    {'Quantity': True},
+    {'Add-ons': 'Whipped cream'},
+    {'Add-ons': [1]},
+    {'Add-ons': {'Extra milk': 1}},
+    {'Add-ons': 'Extra milk, Extra milk'},
+    {'Add-ons': ['Extra sugar', 'Extra sugar']},
+])
+def test_normalize_line_rejects_invalid_fields(fields):
+    with pytest.raises(ValueError):
+        normalize_line(line(**fields))
+
+
+def test_normalize_line_rejects_non_dict_lines():
+    with pytest.raises(ValueError):
+        normalize_line(['latte'])
+
+
+# quote
+
+def test_quote_of_an_empty_cart(service):
+    quote = service.quote([])
+    assert quote['subtotal'] == quote['total'] == 0.0
+    assert quote['wait_seconds'] == 0
+
+
+def test_quote_applies_coupon_and_points(service, make_customer):
+    customer_id = make_customer('amy', points=10)
+    with service.pool.connection() as conn:
+        add_coupon(conn, 'SAVE2', 2.0, date.today() + timedelta(days=1))
+    cart = [normalize_line(line())]
+
+    quote = service.quote(cart, 'SAVE2', customer_id, 4)
+
+    subtotal = 2 * coffee_menu['Americano']['small']
+    assert quote['subtotal'] == subtotal
+    assert quote['daily_offer'] == americano_offer(service, subtotal)
+    assert quote['coupon_discount'] == 2.0
+    assert quote['points_balance'] == 10
+    assert quote['loyalty_discount'] == 4 * POINT_VALUE
+    assert quote['total'] == round(subtotal - quote['daily_offer'] - 2.0 - 4 * POINT_VALUE, 2)
+
+
+def test_quote_ignores_unknown_coupons(service):
+    quote = service.quote([normalize_line(line())], 'NOPE')
+    assert quote['coupon_discount'] is None
+    assert quote['total'] == round(quote['subtotal'] - quote['daily_offer'], 2)
+
+
+def test_quote_only_counts_points_the_balance_covers(service, make_customer):
+    customer_id = make_customer('ben', points=3)
+    quote = service.quote([normalize_line(line())], customer_id=customer_id, points_to_redeem=4)
+    assert quote['loyalty_discount'] == 0.0
+
+
+@pytest.mark.parametrize('customer, points', [(True, -1), (True, 1.5), (True, True), (False, 1)])
+def test_quote_rejects_invalid_points(service, make_customer, customer, points):
+    customer_id = make_customer('cat', points=10) if customer else None
+    with pytest.raises(ValueError):
+        service.quote([normalize_line(line())], customer_id=customer_id, points_to_redeem=points)
+
+
+def test_points_balance(service, make_customer):
+    assert service.points_balance(None) == 0
+    assert service.points_balance(make_customer('dan', points=7)) == 7
+
+
+# place_order
+
+def test_place_order_redeems_coupon_and_points(service, make_customer):
+    customer_id = make_customer('eve', points=10)
+    with service.pool.connection() as conn:
+        add_coupon(conn, 'SAVE2', 2.0, date.today() + timedelta(days=1))
+    stock = service.stock(BRANCH)
+
+    orders, shortage, quote = service.place_order('Eve', [line(), line(Size='large', Quantity=1)],
+                                                  'SAVE2', customer_id, 4)
+
+    assert shortage is None
+    assert len(orders) == 2
+    assert all(order['Status'] == PROCESSING for order in orders)
+    assert service.queue_count(PROCESSING, BRANCH) == 2
+    assert service.stock(BRANCH)['cups'] == stock['cups'] - 3
+    subtotal = 2 * coffee_menu['Americano']['small'] + coffee_menu['Americano']['large']
+    assert quote['subtotal'] == subtotal
+    assert quote['total'] == round(subtotal - americano_offer(service, subtotal) - 2.0 - 4 * POINT_VALUE, 2)
+    assert service.points_balance(customer_id) == 10 - 4 + points_earned(quote['total'])
+    with service.pool.connection() as conn:
+        assert load_coupons(conn).set_index('Code').loc['SAVE2', 'Redemptions'] == 1
+
+
+def test_place_order_without_enough_points_changes_nothing(service, make_customer):
+    customer_id = make_customer('fay', points=3)
+    stock = service.stock(BRANCH)
+    with pytest.raises(InsufficientPoints):
+        service.place_order('Fay', [line()], customer_id=customer_id, points_to_redeem=4)
+    assert service.stock(BRANCH) == stock
+    assert service.queue_count(PROCESSING) == 0
+    assert service.points_balance(customer_id) == 3
+
+
+def test_place_order_rejects_an_empty_cart(service):
+    with pytest.raises(ValueError):
+        service.place_order('Gus', [])
+
+
+def test_place_order_reports_a_shortage(tmp_path):
+    service = CoffeeShopService(str(tmp_path / 'coffee_shop.db'), {**DEFAULT_STOCK, 'cups': 1})
+    orders, shortage, _ = service.place_order('Hal', [line()])
+    assert orders == []
+    assert shortage == (BRANCH, 'cups')
+    assert service.stock(BRANCH)['cups'] == 1
+
+
+# Kitchen status flow
+
+def test_orders_move_from_kitchen_to_pickup(service):
+    orders, _, _ = service.place_order('Ida', [line(Quantity=1)])
+    number = orders[0]['Order Number']
+
+    assert not service.pickup(BRANCH, number)
+    assert service.mark_ready(BRANCH, number)
+    assert not service.mark_ready(BRANCH, number)
+    assert service.order_status(BRANCH, number) == READY
+    assert service.queue_count(PROCESSING, BRANCH) == 0
+    assert service.queue_count(READY, BRANCH) == 1
+
+    assert service.pickup(BRANCH, number)
+    assert not service.pickup(BRANCH, number)
+    assert service.order_status(BRANCH, number) == PICKED_UP
+    assert service.queue_count(READY, BRANCH) == 0
+
+
+def test_failed_status_write_leaves_the_queue_alone(service, monkeypatch):
+    orders, _, _ = service.place_order('Jo', [line(Quantity=1)])
+    number = orders[0]['Order Number']
+
+    def fail(*args):
+        raise sqlite3.OperationalError('database is locked')
+    monkeypatch.setattr(muglife.service, 'set_order_status', fail)
+
+    with pytest.raises(sqlite3.OperationalError):
+        service.mark_ready(BRANCH, number)
+    assert service.order_status(BRANCH, number) == PROCESSING
+    assert service.queue_count(PROCESSING, BRANCH) == 1